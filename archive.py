@@ -0,0 +1,179 @@
+"""Weekly archive of what each run extracted, and the trends computed from it.
+
+Every run appends its report sections to `<root>/<report>/<ISO week>.jsonl.gz`.
+Each line is one section of one run, stored column-wise:
+
+    {"run_at": "...", "week": "2026-W42", "section": "bug_fixes", "sections": 3, "omitted": 0,
+     "columns": {"id": [...], "title": [...], "date": [...], "status": [...], "priority": [...]}}
+
+`omitted` counts the items a section had past SECTION_MAX_ITEMS, which were
+not extracted into the columns; the trend counts include them.
+
+Files are append-only gzip (one member per run), so a crash can only lose the
+run being written: a run whose `sections` lines are not all readable is
+ignored. Several runs in one week are fine: readers keep the latest
+run of each week. Trends are computed from the archive alone, without touching
+Notion.
+"""
+import gzip
+import json
+import logging
+import os
+import re
+from collections import Counter
+
+from dates import parse_utc
+
+log = logging.getLogger('notion_email.archive')
+
+# Item attributes stored per section; a missing attribute is stored as ''
+COLUMNS = ('id', 'title', 'date', 'status', 'priority')
+
+WEEK_FILE = re.compile(r'^(\d{4}-W\d{2})\.jsonl\.gz$')
+UNSAFE_NAME = re.compile(r'[^\w.-]')
+
+
+def iso_week(when):
+    year, week, _ = when.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def to_columns(items):
+    """Column arrays of the archived attributes of `items`"""
+    return {name: [getattr(item, name, '') or '' for item in items] for name in COLUMNS}
+
+
+class WeeklyArchive:
+    """Gzip JSONL files of extracted report sections, one per report and ISO week"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _directory(self, report_name):
+        return os.path.join(self.root, UNSAFE_NAME.sub('_', report_name))
+
+    def path(self, report_name, week):
+        return os.path.join(self._directory(report_name), f"{week}.jsonl.gz")
+
+    def append(self, report_name, now, sections, omitted=None):
+        """Add one run's sections ({section: items}) to the partition of `now`'s week; returns the file path
+
+        `omitted` maps sections to how many of their items were left out.
+        """
+        week = iso_week(now)
+        path = self.path(report_name, week)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        omitted = omitted or {}
+        lines = [
+            json.dumps({'run_at': now.isoformat(), 'week': week, 'section': section, 'sections': len(sections),
+                        'omitted': omitted.get(section, 0), 'columns': to_columns(items)}, separators=(',', ':'))
+            for section, items in sections.items()
+        ]
+        # One gzip member per run; readers see the concatenated members as one stream
+        with gzip.open(path, 'at', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        return path
+
+    def weeks(self, report_name):
+        """ISO weeks archived for a report, oldest first"""
+        try:
+            names = os.listdir(self._directory(report_name))
+        except FileNotFoundError:
+            return []
+        return sorted(match.group(1) for match in map(WEEK_FILE.match, names) if match)
+
+    def read_week(self, report_name, week):
+        """{section: columns} of the week's latest complete run; columns['omitted'] is the count left out"""
+        runs, expected = {}, {}
+        try:
+            with gzip.open(self.path(report_name, week), 'rt', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    columns = dict(record['columns'], omitted=record.get('omitted', 0))
+                    runs.setdefault(record['run_at'], {})[record['section']] = columns
+                    expected[record['run_at']] = record['sections']
+        except EOFError:
+            log.warning("Archive %s ends in an incomplete run", self.path(report_name, week))
+        complete = [run_at for run_at, sections in runs.items() if len(sections) == expected[run_at]]
+        return runs[max(complete)] if complete else {}
+
+    def read(self, report_name, weeks=None):
+        """{week: {section: columns}} of the latest run of each of the last `weeks` archived weeks"""
+        archived = self.weeks(report_name)
+        if weeks:
+            archived = archived[-weeks:]
+        return {week: self.read_week(report_name, week) for week in archived}
+
+
+def compute_trends(history):
+    """Velocity, bug-fix priority mix and slip rate per week from WeeklyArchive.read() output
+
+    An item first seen in upcoming_launches slipped when a later week lists it
+    (upcoming or launched) with a later date than first planned. Counts include
+    the items a section omitted; the priority mix and slips only see archived ones.
+    """
+    trends = []
+    planned = {}  # id -> (first week, first planned date)
+    slipped = set()
+    for week, sections in history.items():
+        empty = dict({name: [] for name in COLUMNS}, omitted=0)
+        launches = sections.get('recent_launches', empty)
+        upcoming = sections.get('upcoming_launches', empty)
+        fixes = sections.get('bug_fixes', empty)
+        for columns in (launches, upcoming):
+            for item_id, date in zip(columns['id'], columns['date']):
+                if item_id in planned and date and _later(date, planned[item_id][1]):
+                    slipped.add(item_id)
+        for item_id, date in zip(upcoming['id'], upcoming['date']):
+            if item_id not in planned and date:
+                planned[item_id] = (week, date)
+        trends.append({
+            'week': week,
+            'launches': _count(launches),
+            'bug_fixes': _count(fixes),
+            'upcoming': _count(upcoming),
+            'priority_mix': dict(Counter(priority or 'None' for priority in fixes['priority']).most_common()),
+        })
+    # Slips are credited to the week an item was first planned in
+    first_seen = Counter(week for week, _ in planned.values())
+    slips = Counter(planned[item_id][0] for item_id in slipped)
+    for row in trends:
+        row['planned'] = first_seen[row['week']]
+        row['slipped'] = slips[row['week']]
+        row['slip_rate'] = round(row['slipped'] / row['planned'], 3) if row['planned'] else None
+    return trends
+
+
+def _count(columns):
+    return len(columns['id']) + columns.get('omitted', 0)
+
+
+def _later(date, original):
+    try:
+        return parse_utc(date) > parse_utc(original)
+    except ValueError:
+        return False
+
+
+def format_trends(report_name, trends):
+    """Markdown table of compute_trends() output"""
+    lines = [
+        f"### Trends for {report_name}",
+        '',
+        '| Week | Launches | Bug fixes | Priority mix | Upcoming | Slipped | Slip rate |',
+        '| --- | ---: | ---: | --- | ---: | ---: | ---: |',
+    ]
+    for row in trends:
+        mix = ', '.join(f"{name} {count}" for name, count in row['priority_mix'].items()) or '-'
+        rate = f"{row['slip_rate']:.0%}" if row['slip_rate'] is not None else '-'
+        lines.append(f"| {row['week']} | {row['launches']} | {row['bug_fixes']} | {mix} | "
+                     f"{row['upcoming']} | {row['slipped']} | {rate} |")
+    if len(trends) > 1:
+        weeks = len(trends)
+        lines += ['', f"Average per week over {weeks} weeks: "
+                      f"{sum(row['launches'] for row in trends) / weeks:.1f} launches, "
+                      f"{sum(row['bug_fixes'] for row in trends) / weeks:.1f} bug fixes."]
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,269 @@
+"""Offline benchmarks for the email pipeline, run against fake_notion.py.
+
+    python benchmark.py fetch --releases 500 --tasks 500 --latency 0.2
+    python benchmark.py render --items 10000
+    python benchmark.py pipeline --releases 10000 --tasks 10000 --save baseline.json
+    python benchmark.py pipeline --releases 10000 --tasks 10000 --baseline baseline.json
+    python benchmark.py pipeline --releases 50000 --tasks 50000 --max-items 1000 --memory
+    python benchmark.py import --budget-ms 60
+
+`pipeline` times every stage of main() (fetch, extract, recipients, render,
+send to a local SMTP sink) and exits non-zero when a stage is slower than the
+baseline by more than --tolerance.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import fake_notion
+
+STAGES = ['fetch', 'extract', 'recipients', 'render', 'send', 'total']
+
+
+def _load_main(server_url, **env):
+    """Import main.py configured to talk to the fake server (plus any extra settings in `env`)"""
+    os.environ['NOTION_TOKEN'] = os.environ.get('NOTION_TOKEN') or 'fake-token'
+    os.environ['NOTION_BASE_URL'] = server_url
+    os.environ['DEV_RELEASES_DB'] = fake_notion.RELEASES_DB_ID
+    os.environ['DEVELOPMENT_TASKS_DB'] = fake_notion.TASKS_DB_ID
+    os.environ.update(env)
+    import main
+    return main
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _time_fetch(main, concurrency, repeat):
+    timings = []
+    for _ in range(repeat):
+        snapshot = main.RunSnapshot()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            snapshot.prefetch(max_workers=concurrency)
+        timings.append(time.perf_counter() - started)
+    return timings, snapshot
+
+
+def bench_fetch(args):
+    """Compare sequential and concurrent section fetching"""
+    databases = fake_notion.default_databases(args.releases, args.tasks)
+    with fake_notion.FakeNotionServer(databases, latency=args.latency) as server:
+        main = _load_main(server.url, NOTION_RATE_LIMIT=str(args.rate_limit))
+        print(f"Fake Notion at {server.url}: {args.releases} releases, {args.tasks} tasks, "
+              f"{args.latency * 1000:.0f} ms latency per request, rate limit {args.rate_limit or 'off'}")
+        baseline = None
+        for concurrency in (1, args.concurrency):
+            timings, snapshot = _time_fetch(main, concurrency, args.repeat)
+            median = statistics.median(timings)
+            baseline = baseline or median
+            print(f"  concurrency={concurrency}: median {median * 1000:.1f} ms over {args.repeat} runs, "
+                  f"{snapshot.api_calls} API calls, speedup x{baseline / median:.2f}")
+
+
+def bench_render(args):
+    """Time format_email_content on synthetic records"""
+    os.environ.setdefault('NOTION_TOKEN', 'fake-token')
+    import main
+    with contextlib.redirect_stdout(io.StringIO()):
+        releases = [main.extract_release_data(page) for page in fake_notion.make_release_pages(args.items)]
+        fixes = [main.extract_task_data(page) for page in fake_notion.make_task_pages(args.items)]
+    recent, upcoming = releases[::2], releases[1::2]
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            html = main.format_email_content(recent, upcoming, fixes)
+        timings.append(time.perf_counter() - started)
+    print(f"Rendered {len(releases)} releases and {len(fixes)} bug fixes into {len(html) / 1024:.0f} KiB: "
+          f"median {statistics.median(timings) * 1000:.1f} ms over {args.repeat} runs")
+
+
+def _run_pipeline(main, transport):
+    """One pass of main()'s stages; returns seconds per stage and the item counts"""
+    timings = dict.fromkeys(STAGES, 0.0)
+    main.metrics.reset()
+    started = time.perf_counter()
+    snapshot = main.RunSnapshot()
+    snapshot.prefetch()
+    # Extraction streams inside the fetch, so its time is reported separately and taken out of fetch
+    timings['extract'] = main.metrics.stages.get('extract', 0.0)
+    timings['fetch'] = max(0.0, time.perf_counter() - started - timings['extract'])
+    recent, upcoming, fixes = snapshot.recent_launches, snapshot.upcoming_launches, snapshot.bug_fixes
+
+    stage = time.perf_counter()
+    snapshot.recipient_index
+    timings['recipients'] = time.perf_counter() - stage
+
+    # send_email renders and serializes the message inside its 'render' stage
+    stage = time.perf_counter()
+    main.send_email(recent, upcoming, fixes, snapshot, transport)
+    timings['render'] = main.metrics.stages.get('render', 0.0)
+    timings['send'] = time.perf_counter() - stage - timings['render']
+
+    timings['total'] = time.perf_counter() - started
+    counts = {'recent': len(recent), 'upcoming': len(upcoming), 'bug_fixes': len(fixes),
+              'omitted': sum(snapshot.omitted.values()), 'api_calls': snapshot.api_calls,
+              'message_bytes': main.metrics.counters.get('message_bytes', 0)}
+    return timings, counts
+
+
+def _check_regressions(medians, baseline_path, tolerance):
+    """Stages slower than the saved baseline by more than `tolerance` (a fraction)"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)['stages']
+    regressions = []
+    for stage, seconds in medians.items():
+        reference = baseline.get(stage)
+        # Ignore stages too fast to time reliably
+        if reference and max(seconds, reference) > 0.005 and seconds > reference * (1 + tolerance):
+            regressions.append((stage, reference, seconds))
+    return regressions
+
+
+def bench_pipeline(args):
+    """Time fetch, extract, recipients, render and send of one weekly run end to end"""
+    from smtp_sink import SMTPSink
+
+    databases = fake_notion.default_databases(args.releases, args.tasks)
+    server = fake_notion.FakeNotionServer(databases, latency=args.latency,
+                                          throttle_rate=args.throttle_rate, retry_after=args.retry_after)
+    port = _free_port()
+    with server, SMTPSink(port=port, max_size=0) as sink:
+        main = _load_main(
+            server.url,
+            SMTP_HOST='127.0.0.1', SMTP_PORT=str(port), SMTP_STARTTLS='0',
+            EMAIL_USER=os.environ.get('EMAIL_USER') or 'bench@example.com',
+            NOTION_RATE_LIMIT=str(args.rate_limit),
+            OUTBOX_PATH='', NOTION_CACHE_PATH='', EMAIL_MAX_BYTES=str(args.max_bytes),
+            SECTION_MAX_ITEMS=str(args.max_items),
+        )
+        print(f"Fake Notion at {server.url}: {args.releases} releases, {args.tasks} tasks, "
+              f"{args.latency * 1000:.0f} ms latency, {args.throttle_rate:.0%} throttled; SMTP sink on port {port}")
+        runs = []
+        transport = main.get_transport()
+        try:
+            for _ in range(args.repeat):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    runs.append(_run_pipeline(main, transport))
+            if args.memory:
+                # A separate run, as tracing slows every allocation down
+                tracemalloc.start()
+                try:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        _run_pipeline(main, transport)
+                    peak = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+        finally:
+            main.close_transport()
+
+        medians = {stage: statistics.median(timings[stage] for timings, _ in runs) for stage in STAGES}
+        counts = runs[-1][1]
+        print(f"  {counts['recent']} recent, {counts['upcoming']} upcoming, {counts['bug_fixes']} bug fixes"
+              + (f" ({counts['omitted']} more past --max-items)" if counts['omitted'] else "") + "; "
+              f"{counts['api_calls']} API calls per run, {server.throttled} requests throttled, "
+              f"{len(sink.messages)} messages sent, {counts['message_bytes'] / 1024:.0f} KiB of email")
+        for stage in STAGES:
+            print(f"  {stage:<10} median {medians[stage] * 1000:9.1f} ms over {args.repeat} runs")
+        if args.memory:
+            print(f"  peak traced memory {peak / 1024 / 1024:.1f} MiB")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'stages': medians, 'counts': counts, 'args': vars(args) | {'func': None}}, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+    if args.baseline:
+        regressions = _check_regressions(medians, args.baseline, args.tolerance)
+        for stage, reference, seconds in regressions:
+            print(f"  REGRESSION {stage}: {reference * 1000:.1f} ms -> {seconds * 1000:.1f} ms")
+        if regressions:
+            return 1
+        print(f"No stage regressed by more than {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+IMPORT_PROBE = (
+    "import sys, time; started = time.perf_counter(); import main; "
+    "print(time.perf_counter() - started, 'notion_client' in sys.modules, 'email.mime.text' in sys.modules)"
+)
+
+
+def bench_import(args):
+    """Time `import main` in fresh interpreters and check that heavy modules stay unloaded"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for _ in range(args.repeat):
+        output = subprocess.run([sys.executable, '-c', IMPORT_PROBE], cwd=here, check=True,
+                                capture_output=True, text=True).stdout.split()
+        timings.append(float(output[0]))
+    eager = [name for name, loaded in zip(('notion_client', 'email.mime'), output[1:]) if loaded == 'True']
+    median = statistics.median(timings) * 1000
+    print(f"import main: median {median:.1f} ms over {args.repeat} runs"
+          + (f", eagerly imports {', '.join(eager)}" if eager else ""))
+    if args.budget_ms and median > args.budget_ms:
+        print(f"  REGRESSION: over the {args.budget_ms:.0f} ms budget")
+        return 1
+    return 1 if eager else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Notion email pipeline offline')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    fetch = sub.add_parser('fetch', help='sequential vs concurrent Notion fetching')
+    fetch.add_argument('--releases', type=int, default=300)
+    fetch.add_argument('--tasks', type=int, default=300)
+    fetch.add_argument('--latency', type=float, default=0.1, help='seconds added to each fake request')
+    fetch.add_argument('--concurrency', type=int, default=3)
+    fetch.add_argument('--rate-limit', type=float, default=0,
+                       help='client-side requests per second (0 disables pacing, so latency overlap is measured)')
+    fetch.add_argument('--repeat', type=int, default=3)
+    fetch.set_defaults(func=bench_fetch)
+
+    render = sub.add_parser('render', help='HTML rendering of synthetic records')
+    render.add_argument('--items', type=int, default=10000, help='releases and bug fixes to render (each)')
+    render.add_argument('--repeat', type=int, default=5)
+    render.set_defaults(func=bench_render)
+
+    pipeline = sub.add_parser('pipeline', help='end-to-end stage timings of main() against fake Notion and SMTP')
+    pipeline.add_argument('--releases', type=int, default=1000, help='rows in Dev Releases (100 to 100000)')
+    pipeline.add_argument('--tasks', type=int, default=1000, help='rows in Development Tasks (100 to 100000)')
+    pipeline.add_argument('--latency', type=float, default=0.0, help='seconds added to each fake request')
+    pipeline.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of requests answered with 429')
+    pipeline.add_argument('--retry-after', type=float, default=0.1, help='Retry-After seconds sent with each 429')
+    pipeline.add_argument('--rate-limit', type=float, default=0,
+                          help='client-side requests per second (0 disables pacing to time the code itself)')
+    pipeline.add_argument('--max-bytes', type=int, default=0,
+                          help='EMAIL_MAX_BYTES for the run (0 sends every item, the default here)')
+    pipeline.add_argument('--max-items', type=int, default=0,
+                          help='SECTION_MAX_ITEMS for the run (0 keeps every item, the default here)')
+    pipeline.add_argument('--memory', action='store_true', help='also report the peak memory of one traced run')
+    pipeline.add_argument('--repeat', type=int, default=3)
+    pipeline.add_argument('--save', help='write the stage medians to this JSON file')
+    pipeline.add_argument('--baseline', help='fail if a stage is slower than this saved JSON baseline')
+    pipeline.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown against the baseline')
+    pipeline.set_defaults(func=bench_pipeline)
+
+    imports = sub.add_parser('import', help='time `import main` in a fresh interpreter')
+    imports.add_argument('--repeat', type=int, default=5)
+    imports.add_argument('--budget-ms', type=float, default=0, help='fail when the median exceeds this')
+    imports.set_defaults(func=bench_import)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Parsing and formatting of Notion dates, and the clock a run measures its windows from.
+
+Notion sends the same date strings over and over (every bug closed on one day,
+every page of a query that is sorted again on the client), so each distinct
+string is parsed once and kept in an LRU, and formatted dates are cached the
+same way. Everything here is timezone-aware: values without an offset are taken
+as UTC and run_clock() is UTC, so query windows, item dates and sorts always
+compare real instants, whatever the machine's local zone is.
+"""
+import functools
+from datetime import datetime, timezone
+
+# Distinct date strings / (datetime, format) pairs kept per process
+PARSE_CACHE_SIZE = 16384
+FORMAT_CACHE_SIZE = 4096
+
+
+def run_clock():
+    """The current time as an aware UTC datetime; a run reads it once and derives every window from it"""
+    return datetime.now(timezone.utc)
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_datetime(value):
+    """Aware datetime of a Notion date/datetime string, keeping its offset (naive values are taken as UTC)
+
+    Raises ValueError for text that is not an ISO 8601 date.
+    """
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_utc(value):
+    """parse_datetime() converted to UTC, whose isoformat() strings also sort chronologically"""
+    return parse_datetime(value).astimezone(timezone.utc)
+
+
+@functools.lru_cache(maxsize=None)
+def get_zone(name):
+    """tzinfo for an IANA zone name such as 'Europe/Berlin'; None for an empty name"""
+    if not name:
+        return None
+    from zoneinfo import ZoneInfo
+    return ZoneInfo(name)
+
+
+def is_date_only(value):
+    """True for a Notion date without a time of day, such as '2026-10-10'"""
+    return bool(value) and 'T' not in value
+
+
+def format_datetime(when, fmt, zone=None):
+    """strftime of an aware datetime, converted to `zone` first when one is given"""
+    # Aware datetimes of the same instant compare and hash equal whatever their
+    # offset, so the tzinfo is part of the cache key
+    return _format_datetime(when, when.tzinfo, fmt, zone)
+
+
+@functools.lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def _format_datetime(when, tzinfo, fmt, zone):
+    return (when.astimezone(zone) if zone is not None else when).strftime(fmt)
@@ -0,0 +1,219 @@
+"""Pluggable outgoing-mail transports.
+
+SMTPTransport keeps a small pool of authenticated connections that are reused
+across messages, splits large recipient lists into batches that stay under the
+provider's per-message limit and retries transient (4xx / dropped connection)
+failures with jittered exponential backoff. FileTransport writes messages to a
+directory instead, for previews and dry runs.
+"""
+import logging
+import os
+import random
+import re
+import smtplib
+import socket
+import threading
+import time
+
+from redaction import RedactedEmails
+
+log = logging.getLogger('notion_email.transport')
+
+UNSAFE_NAME = re.compile(r'[^\w.@-]+')
+
+
+def batched(recipients, size):
+    """Split a recipient list into chunks of at most `size` addresses"""
+    size = max(1, size)
+    return [recipients[i:i + size] for i in range(0, len(recipients), size)]
+
+
+class Transport:
+    """Interface every transport implements"""
+
+    def send(self, message, from_addr, recipients, key=None):
+        """Deliver a serialized message to `recipients`; returns the addresses the server refused
+
+        `key` is the message's idempotency key, which transports may use to name it.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SMTPTransport(Transport):
+    """SMTP delivery over a pool of reusable, authenticated connections"""
+
+    # Connections idle for longer than this are checked with NOOP before reuse
+    IDLE_CHECK_SECONDS = 30
+
+    def __init__(self, host, port, username=None, password=None, starttls=True, pool_size=2,
+                 max_recipients=100, max_retries=3, backoff_base=1.0, backoff_max=30.0, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.pool_size = max(1, pool_size)
+        self.max_recipients = max_recipients
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.connections_opened = 0
+        self.connect_seconds = 0.0
+        self.retries = 0
+        self._idle = []  # (connection, released at), most recently released last
+        self._open = 0
+        self._lock = threading.Lock()
+        # Signalled whenever a connection is released or discarded, waking threads waiting for one
+        self._available = threading.Condition(self._lock)
+
+    def _connect(self):
+        started = time.perf_counter()
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        with self._lock:
+            self.connections_opened += 1
+            self.connect_seconds += time.perf_counter() - started
+        log.debug("Opened SMTP connection to %s:%s", self.host, self.port)
+        return server
+
+    def _acquire(self):
+        """Take an idle connection, open a new one while under pool_size, or wait for one to be released"""
+        while True:
+            with self._available:
+                while not self._idle and self._open >= self.pool_size:
+                    self._available.wait()
+                if self._idle:
+                    server, released = self._idle.pop()
+                else:
+                    self._open += 1
+                    server = None
+            if server is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    with self._available:
+                        self._open -= 1
+                        self._available.notify()
+                    raise
+            if time.monotonic() - released < self.IDLE_CHECK_SECONDS:
+                return server
+            # Connections idle for a while may have been dropped by the server
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._discard(server)
+
+    def _release(self, server):
+        with self._available:
+            self._idle.append((server, time.monotonic()))
+            self._available.notify()
+
+    def _discard(self, server):
+        with self._available:
+            self._open -= 1
+            self._available.notify()
+        try:
+            server.close()
+        except OSError:
+            pass
+
+    @staticmethod
+    def _is_transient(error):
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            return False
+        if isinstance(error, smtplib.SMTPResponseException):
+            return 400 <= error.smtp_code < 500
+        return isinstance(error, (smtplib.SMTPServerDisconnected, socket.timeout, ConnectionError))
+
+    def _send_batch(self, message, from_addr, batch):
+        attempt = 0
+        while True:
+            server = None
+            try:
+                server = self._acquire()
+                refused = server.sendmail(from_addr, batch, message)
+            except Exception as e:
+                if server is not None:
+                    self._discard(server)
+                if not self._is_transient(e) or attempt >= self.max_retries:
+                    raise
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+                log.warning("SMTP send failed (%s), retry %d/%d in %.1fs", RedactedEmails(e), attempt + 1,
+                            self.max_retries, delay)
+                with self._lock:
+                    self.retries += 1
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._release(server)
+            return refused
+
+    def send(self, message, from_addr, recipients, key=None):
+        refused = {}
+        for batch in batched(list(recipients), self.max_recipients):
+            refused.update(self._send_batch(message, from_addr, batch))
+        if refused:
+            log.warning("SMTP server refused %d recipients", len(refused))
+        return refused
+
+    def close(self):
+        """Politely close every idle connection"""
+        while True:
+            with self._available:
+                if not self._idle:
+                    return
+                server, _ = self._idle.pop()
+                self._open -= 1
+                self._available.notify()
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                server.close()
+
+
+class FileTransport(Transport):
+    """Writes each message to `directory` as <key>.eml, with its HTML and text parts beside it"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.written = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def send(self, message, from_addr, recipients, key=None):
+        import email
+        from email import policy
+        with self._lock:
+            self.written += 1
+            name = UNSAFE_NAME.sub('_', key) if key else f"message-{self.written:04d}"
+        data = message if isinstance(message, bytes) else message.encode()
+        base = os.path.join(self.directory, name)
+        with open(base + '.eml', 'wb') as f:
+            f.write(data)
+        parsed = email.message_from_bytes(data, policy=policy.default)
+        for subtype, extension in (('html', '.html'), ('plain', '.txt')):
+            part = parsed.get_body((subtype,))
+            if part is not None:
+                with open(base + extension, 'w', encoding='utf-8', newline='') as f:
+                    f.write(part.get_content())
+        log.info("Wrote message %d for %d recipients to %s", self.written, len(recipients), self.directory)
+        return {}
@@ -0,0 +1,280 @@
+"""Local stand-in for the Notion API, used for offline benchmarks and experiments.
+
+Serves synthetic Dev Releases and Development Tasks databases (100 to 100k rows)
+over HTTP so that main.py can be pointed at it with NOTION_BASE_URL. Queries are
+answered with Notion's cursor pagination, filters and sorts; a fraction of
+requests can be answered with 429 + Retry-After to exercise the retry path.
+Run it standalone with:
+
+    python fake_notion.py --releases 500 --tasks 500 --latency 0.2 --throttle-rate 0.1
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from notion_cache import page_matches_filter, sort_pages
+
+RELEASES_DB_ID = 'fake-dev-releases'
+TASKS_DB_ID = 'fake-development-tasks'
+
+RELEASE_STATUSES = ['Completed', 'Upcoming', 'In Progress', 'Blocked']
+PRIORITIES = ['Critical', 'High', 'Medium', 'Low']
+
+QUERY_PATH = re.compile(r'^/v1/databases/([^/]+)/query/?$')
+DATABASE_PATH = re.compile(r'^/v1/databases/([^/]+)/?$')
+
+
+def _rich_text(content):
+    return [{'type': 'text', 'text': {'content': content}, 'plain_text': content}]
+
+
+def _timestamp(value):
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:00.000Z')
+
+
+def make_release_pages(count, seed=0):
+    """Build `count` synthetic Dev Releases pages spread around today"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    pages = []
+    for i in range(count):
+        date = now + timedelta(days=rng.randint(-21, 21), hours=rng.randint(0, 23))
+        edited = now - timedelta(minutes=rng.randint(0, 60 * 24 * 28))
+        pages.append({
+            'object': 'page',
+            'id': f'release-{i:08d}',
+            'created_time': _timestamp(edited - timedelta(days=7)),
+            'last_edited_time': _timestamp(edited),
+            'properties': {
+                'Event Name': {'type': 'title', 'title': _rich_text(f'Release {i}')},
+                'Description': {'type': 'rich_text', 'rich_text': _rich_text(f'Synthetic release number {i}')},
+                'Date': {'type': 'date', 'date': {'start': date.isoformat(), 'end': None}},
+                'Status': {'type': 'status', 'status': {'name': rng.choice(RELEASE_STATUSES)}},
+                'Email To': {'type': 'rich_text', 'rich_text': _rich_text(f'team{i % 25}@example.com')},
+                'Email CC': {'type': 'rich_text', 'rich_text': _rich_text(f'lead{i % 5}@example.com')},
+            },
+        })
+    return pages
+
+
+def make_task_pages(count, seed=0):
+    """Build `count` synthetic Development Tasks bug pages"""
+    rng = random.Random(seed + 1)
+    now = datetime.now()
+    pages = []
+    for i in range(count):
+        done = now - timedelta(days=rng.randint(0, 21))
+        pages.append({
+            'object': 'page',
+            'id': f'task-{i:08d}',
+            'created_time': _timestamp(done - timedelta(days=3)),
+            'last_edited_time': _timestamp(done),
+            'properties': {
+                'Name': {'type': 'title', 'title': _rich_text(f'Bug {i}')},
+                'Description': {'type': 'rich_text', 'rich_text': _rich_text(f'Synthetic bug fix number {i}')},
+                'Type': {'type': 'select', 'select': {'name': 'Bug'}},
+                'Status': {'type': 'status', 'status': {'name': 'Done'}},
+                'Done Date': {'type': 'date', 'date': {'start': done.date().isoformat(), 'end': None}},
+                'Priority': {'type': 'select', 'select': {'name': rng.choice(PRIORITIES)}},
+            },
+        })
+    return pages
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 makes concurrent clients wait for SYN retries
+    request_queue_size = 128
+
+
+class FakeNotionServer:
+    """Threaded HTTP server answering database queries from in-memory page lists
+
+    `throttle_rate` is the fraction of requests answered with 429 and a
+    Retry-After of `retry_after` seconds instead of being served.
+    """
+
+    MAX_VIEWS = 32
+
+    def __init__(self, databases, latency=0.0, host='127.0.0.1', port=0, throttle_rate=0.0, retry_after=1, seed=0):
+        self.databases = databases
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.requests = 0
+        self.throttled = 0
+        self._rng = random.Random(seed)
+        self._views = {}
+        self._lock = threading.Lock()
+        self._httpd = _HTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                match = DATABASE_PATH.match(urlsplit(self.path).path)
+                if not match or match.group(1) not in server.databases:
+                    return self._not_found()
+                if self._count():
+                    return self._rate_limited()
+                self._send(200, server.schema(match.group(1)))
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}')
+                url = urlsplit(self.path)
+                match = QUERY_PATH.match(url.path)
+                if not match or match.group(1) not in server.databases:
+                    return self._not_found()
+                if self._count():
+                    return self._rate_limited()
+                projection = parse_qs(url.query).get('filter_properties')
+                try:
+                    payload = server.query(match.group(1), body, projection)
+                except ValueError as e:
+                    return self._send(400, {'object': 'error', 'status': 400, 'code': 'validation_error',
+                                            'message': str(e)})
+                self._send(200, payload)
+
+            def _count(self):
+                """Record the request and sleep the configured latency; returns True if it should be throttled"""
+                with server._lock:
+                    server.requests += 1
+                    throttle = server.throttle_rate > 0 and server._rng.random() < server.throttle_rate
+                    if throttle:
+                        server.throttled += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                return throttle
+
+            def _rate_limited(self):
+                self._send(429, {'object': 'error', 'status': 429, 'code': 'rate_limited',
+                                 'message': 'You have been rate limited. Please try again in a few minutes.'},
+                           headers={'Retry-After': f'{server.retry_after:g}'})
+
+            def _not_found(self):
+                self._send(404, {'object': 'error', 'status': 404, 'code': 'object_not_found',
+                                 'message': f'Could not find database for {self.path}'})
+
+            def _send(self, status, payload, headers=None):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def schema(self, database_id):
+        """Database object whose property ids are the property names"""
+        pages = self.databases[database_id]
+        properties = pages[0]['properties'] if pages else {}
+        return {
+            'object': 'database',
+            'id': database_id,
+            'properties': {name: {'id': name, 'name': name, 'type': prop['type']} for name, prop in properties.items()},
+        }
+
+    def view(self, database_id, filter=None, sorts=None):
+        """Pages matching `filter` in `sorts` order, computed once per distinct query so paging stays cheap"""
+        key = (database_id, json.dumps(filter, sort_keys=True), json.dumps(sorts, sort_keys=True))
+        with self._lock:
+            pages = self._views.get(key)
+        if pages is None:
+            pages = self.databases[database_id]
+            if filter:
+                pages = [page for page in pages if page_matches_filter(page, filter)]
+            if sorts:
+                pages = sort_pages(pages, sorts)
+            with self._lock:
+                if len(self._views) >= self.MAX_VIEWS:
+                    # Report filters embed the current time, so old views are never asked for again
+                    self._views.clear()
+                self._views[key] = pages
+        return pages
+
+    def query(self, database_id, body, projection=None):
+        """Answer one query page using the Notion cursor protocol"""
+        pages = self.view(database_id, body.get('filter'), body.get('sorts'))
+        page_size = min(int(body.get('page_size') or 100), 100)
+        start = int(body.get('start_cursor') or 0)
+        end = start + page_size
+        has_more = end < len(pages)
+        results = pages[start:end]
+        if projection:
+            results = [dict(page, properties={name: prop for name, prop in page['properties'].items()
+                                              if prop.get('id', name) in projection})
+                       for page in results]
+        return {
+            'object': 'list',
+            'results': results,
+            'has_more': has_more,
+            'next_cursor': str(end) if has_more else None,
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def default_databases(releases=200, tasks=200, seed=0):
+    """Synthetic databases keyed by the ids main.py should be configured with"""
+    return {
+        RELEASES_DB_ID: make_release_pages(releases, seed),
+        TASKS_DB_ID: make_task_pages(tasks, seed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a fake Notion API with synthetic databases')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--releases', type=int, default=200, help='rows in the Dev Releases database')
+    parser.add_argument('--tasks', type=int, default=200, help='rows in the Development Tasks database')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds of delay added to every request')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of requests answered with 429')
+    parser.add_argument('--retry-after', type=float, default=1, help='Retry-After seconds sent with each 429')
+    args = parser.parse_args()
+
+    server = FakeNotionServer(default_databases(args.releases, args.tasks), latency=args.latency, port=args.port,
+                              throttle_rate=args.throttle_rate, retry_after=args.retry_after)
+    print(f"Fake Notion API listening on {server.url}")
+    print(f"  DEV_RELEASES_DB={RELEASES_DB_ID}")
+    print(f"  DEVELOPMENT_TASKS_DB={TASKS_DB_ID}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
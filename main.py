@@ -1,11 +1,36 @@
+import argparse
+import contextlib
+import functools
+import hashlib
+import io
+import logging
 import os
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from notion_client import Client
-from datetime import datetime, timedelta
+import random
+import re
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from notion_cache import MemoryPageCache, PageCache, sort_pages
+from topn import TopN
+from outbox import Outbox, SENT
+from redaction import RedactedEmails
+from run_metrics import RunMetrics, profiled
+from scheduler import CronSchedule, Scheduler
+from reports import DEFAULT_REPORT_NAME, Report, load_reports
+from query_plan import Query, all_of, any_of, date_between, plan_queries
+from dates import format_datetime, get_zone, is_date_only, parse_datetime, run_clock
+from archive import WeeklyArchive, compute_trends, format_trends
+from section_store import SectionStore, content_hash
+from dataclasses import dataclass, replace
+from html import escape, unescape
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
 import json
 
+log = logging.getLogger('notion_email')
+
 # Configuration
 NOTION_TOKEN = os.getenv('NOTION_TOKEN')
 EMAIL_USER = os.getenv('EMAIL_USER')
@@ -16,282 +41,818 @@ EMAIL_SIGNATURE = os.getenv('EMAIL_SIGNATURE', '')  # Optional email signature
 DEV_RELEASES_DB = os.getenv('DEV_RELEASES_DB')  # For launches
 DEVELOPMENT_TASKS_DB = os.getenv('DEVELOPMENT_TASKS_DB')  # For bug fixes
 
+# Time zone the email shows dates in (IANA name, e.g. 'Europe/Berlin'). Empty keeps
+# each Notion date's own offset and dates the email in the machine's local zone.
+REPORT_TIMEZONE = os.getenv('REPORT_TIMEZONE', '')
+
+# Logging: LOG_LEVEL (DEBUG shows per-item detail) and LOG_FORMAT ('text' or 'json' for Actions logs)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+
+# Rows requested per Notion query page (the API allows at most 100)
+NOTION_PAGE_SIZE = min(int(os.getenv('NOTION_PAGE_SIZE', '100')), 100)
+
+# Upper bound on Notion queries in flight at once (1 = sequential)
+NOTION_MAX_CONCURRENCY = max(1, int(os.getenv('NOTION_MAX_CONCURRENCY', '3')))
+
+# Override the API root, e.g. to point at a local fake Notion server
+NOTION_BASE_URL = os.getenv('NOTION_BASE_URL')
+
+# Client-side pacing and retry policy (Notion allows roughly 3 requests per second)
+NOTION_RATE_LIMIT = float(os.getenv('NOTION_RATE_LIMIT', '3'))
+NOTION_BURST = max(1, int(os.getenv('NOTION_BURST', '3')))
+NOTION_MAX_RETRIES = max(0, int(os.getenv('NOTION_MAX_RETRIES', '5')))
+NOTION_BACKOFF_BASE = float(os.getenv('NOTION_BACKOFF_BASE', '0.5'))
+NOTION_BACKOFF_MAX = float(os.getenv('NOTION_BACKOFF_MAX', '30'))
+
+# Incremental sync: SQLite page cache (disabled when unset), how long old pages are kept and
+# how often (seconds) a full sync drops the archived and deleted pages incremental syncs miss
+NOTION_CACHE_PATH = os.getenv('NOTION_CACHE_PATH')
+NOTION_CACHE_RETENTION_DAYS = int(os.getenv('NOTION_CACHE_RETENTION_DAYS', '60'))
+NOTION_CACHE_TTL = int(os.getenv('NOTION_CACHE_TTL', str(7 * 86400)))
+NOTION_FULL_REFRESH = os.getenv('NOTION_FULL_REFRESH', '').lower() in ('1', 'true', 'yes')
+
+# Ask Notion for only the properties the report reads (filter_properties)
+NOTION_PROJECT_PROPERTIES = os.getenv('NOTION_PROJECT_PROPERTIES', '1').lower() not in ('0', 'false', 'no')
+
+# Answer queries on the same database (e.g. recent and upcoming releases) with one
+# merged OR query that is split per section locally
+NOTION_MERGE_QUERIES = os.getenv('NOTION_MERGE_QUERIES', '1').lower() not in ('0', 'false', 'no')
+
+# Properties read from each database; the title property is always included.
+# Status/Type are kept so cached pages can still be filtered locally.
+RELEASE_PROPERTIES = ['Event Name', 'Description', 'Date', 'Status', 'Email To', 'Email CC']
+TASK_PROPERTIES = ['Description', 'Done Date', 'Priority', 'Type', 'Status']
+
+# Outgoing mail (defaults to Gmail). Recipients are split into envelopes of at
+# most SMTP_MAX_RECIPIENTS; 4xx responses are retried up to SMTP_MAX_RETRIES times.
+EMAIL_TRANSPORT = os.getenv('EMAIL_TRANSPORT', 'smtp')
+# Where the 'file' transport (and --dry-run) writes .eml files with their HTML and text parts
+EMAIL_FILE_DIR = os.getenv('EMAIL_FILE_DIR', 'preview')
+SMTP_HOST = os.getenv('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
+SMTP_STARTTLS = os.getenv('SMTP_STARTTLS', '1').lower() not in ('0', 'false', 'no')
+SMTP_POOL_SIZE = max(1, int(os.getenv('SMTP_POOL_SIZE', '4')))
+SMTP_MAX_RECIPIENTS = max(1, int(os.getenv('SMTP_MAX_RECIPIENTS', '100')))
+SMTP_MAX_RETRIES = max(0, int(os.getenv('SMTP_MAX_RETRIES', '3')))
+
+# 'shared' sends one email to everyone; 'personalized' sends each recipient their
+# own digest that starts with the releases listing them, SMTP_POOL_SIZE at a time
+EMAIL_MODE = os.getenv('EMAIL_MODE', 'shared').lower()
+
+# Largest message to send, in bytes as written to SMTP (headers, text and HTML parts).
+# Bigger digests have their sections cut short with an "and N more" link to Notion,
+# which keeps the HTML part under Gmail's ~102 KB clipping point. 0 disables the limit.
+EMAIL_MAX_BYTES = max(0, int(os.getenv('EMAIL_MAX_BYTES', '125000')))
+# Items kept per section, in date order, as pages stream in from Notion; the rest are
+# only counted and summed up as "and N more", so memory stays flat for huge digests.
+# Releases past the limit that list recipients are kept for personalized digests. 0 keeps all.
+SECTION_MAX_ITEMS = max(0, int(os.getenv('SECTION_MAX_ITEMS', '1000')))
+
+# SQLite outbox: every message is stored before it is sent and keyed by ISO week,
+# so reruns never mail the same week twice. Set OUTBOX_PATH to '' to disable.
+OUTBOX_PATH = os.getenv('OUTBOX_PATH', 'outbox.sqlite')
+# Sent messages are kept (without their body) this long, to recognise reruns
+OUTBOX_RETENTION_DAYS = max(1, int(os.getenv('OUTBOX_RETENTION_DAYS', '56')))
+
+# SQLite store of rendered section fragments, reused while a section's items are
+# unchanged, and of the section hashes each report last sent. '' keeps it in memory.
+SECTION_STORE_PATH = os.getenv('SECTION_STORE_PATH', 'sections.sqlite')
+# When every section matches the last sent digest: 'send' it anyway, 'skip' sending,
+# or send a short 'notice' that nothing changed
+UNCHANGED_DIGEST = os.getenv('UNCHANGED_DIGEST', 'send').lower()
+
+# Directory of the weekly gzip JSONL archive every run adds its extracted sections
+# to; `--trends` reports velocity, priority mix and slip rate from it. '' disables.
+ARCHIVE_PATH = os.getenv('ARCHIVE_PATH', 'archive')
+TREND_WEEKS = max(1, int(os.getenv('TREND_WEEKS', '12')))
+
+# Daemon mode (--daemon): digests as 'name=<cron> [shared|personalized] [reports=a,b] [days=N]'
+# separated by ';' (cron in UTC; reports= limits a digest to some reports, days= replaces their
+# lookback_days), and how long its in-memory page cache lives before a full refresh
+DIGESTS = os.getenv('DIGESTS', 'weekly=0 23 * * 5')
+NOTION_MEMORY_CACHE_TTL = int(os.getenv('NOTION_MEMORY_CACHE_TTL', '86400'))
+
+# Run metrics (stage timings, counters, peak RSS) are written to METRICS_PATH as JSON
+# ('' disables) and to the Actions step summary; PROFILE_PATH enables a cProfile dump
+METRICS_PATH = os.getenv('METRICS_PATH', 'metrics.json')
+PROFILE_PATH = os.getenv('PROFILE_PATH')
+
+# Optional JSON file that keeps the recipient index between runs
+# (reports from REPORTS_PATH each get their own file: recipients.<name>.json)
+RECIPIENT_INDEX_PATH = os.getenv('RECIPIENT_INDEX_PATH')
+
+# Optional JSON file defining several reports (see reports.py), run REPORT_CONCURRENCY
+# at a time; without it one report is built from DEV_RELEASES_DB/DEVELOPMENT_TASKS_DB
+REPORTS_PATH = os.getenv('REPORTS_PATH')
+REPORT_CONCURRENCY = max(1, int(os.getenv('REPORT_CONCURRENCY', '4')))
+
 # Fallback recipients if no recipients found in Dev Releases database
 FALLBACK_RECIPIENTS = [email.strip() for email in os.getenv('RECIPIENTS', '').split(',') if email.strip()] if os.getenv('RECIPIENTS') else []
 FALLBACK_CC_RECIPIENTS = [email.strip() for email in os.getenv('CC_RECIPIENTS', '').split(',') if email.strip()] if os.getenv('CC_RECIPIENTS') else []
 
-# Initialize Notion client
-notion = Client(auth=NOTION_TOKEN)
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per log line"""
 
-def get_recipients_from_releases():
-    """Get email recipients from Dev Releases database based on recent/upcoming items"""
-    try:
-        # Get recent launches (completed in last 7 days)
-        one_week_ago = (datetime.now() - timedelta(days=7)).isoformat()
-        today = datetime.now().isoformat()
-        two_weeks_later = (datetime.now() + timedelta(days=14)).isoformat()
-        
-        # First, get recent completed items
-        print("DEBUG: Querying recent completed items...")
-        recent_response = notion.databases.query(
-            database_id=DEV_RELEASES_DB,
-            filter={
-                "and": [
-                    {
-                        "property": "Status",
-                        "status": {
-                            "equals": "Completed"
-                        }
-                    },
-                    {
-                        "property": "Date",
-                        "date": {
-                            "after": one_week_ago
-                        }
-                    }
-                ]
-            }
-        )
-        
-        # Then, get upcoming items
-        print("DEBUG: Querying upcoming items...")
-        upcoming_response = notion.databases.query(
-            database_id=DEV_RELEASES_DB,
-            filter={
-                "and": [
-                    {
-                        "or": [
-                            {
-                                "property": "Status",
-                                "status": {
-                                    "equals": "Upcoming"
-                                }
-                            },
-                            {
-                                "property": "Status",
-                                "status": {
-                                    "equals": "In Progress"
-                                }
-                            }
-                        ]
-                    },
-                    {
-                        "property": "Date",
-                        "date": {
-                            "after": today,
-                            "before": two_weeks_later
-                        }
-                    }
-                ]
+    def format(self, record):
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+def configure_logging(level=LOG_LEVEL, format=LOG_FORMAT):
+    """Route the module's logs to stdout at `level`, as plain text or JSON lines"""
+    handler = logging.StreamHandler(sys.stdout)
+    if format == 'json':
+        handler.setFormatter(JsonLogFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+    log.handlers[:] = [handler]
+    log.setLevel(level)
+    log.propagate = False
+
+class TokenBucket:
+    """Thread-safe token bucket that paces every request sharing it"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available; returns the seconds waited"""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+class RateLimitedNotion:
+    """Notion client wrapper that shares a token bucket and retries 429/5xx responses"""
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, client, bucket=None, max_retries=NOTION_MAX_RETRIES,
+                 backoff_base=NOTION_BACKOFF_BASE, backoff_max=NOTION_BACKOFF_MAX):
+        self.client = client
+        self.bucket = bucket or TokenBucket(NOTION_RATE_LIMIT, NOTION_BURST)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.requests = 0
+        self.retries = 0
+        self.throttled_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # Expose endpoints as on the wrapped client, e.g. notion.databases.query(...)
+        return _RateLimitedEndpoint(self, getattr(self.client, name))
+
+    def _record(self, requests=0, retries=0, throttled=0.0):
+        with self._lock:
+            self.requests += requests
+            self.retries += retries
+            self.throttled_seconds += throttled
+
+    def _retry_delay(self, attempt, error):
+        """Honor Retry-After when Notion sends it, otherwise use jittered exponential backoff"""
+        headers = getattr(error, 'headers', None) or {}
+        try:
+            retry_after = float(headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            retry_after = None
+        backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after is not None:
+            return retry_after + backoff / 2
+        return backoff
+
+    def call(self, method, **kwargs):
+        """Invoke a client method under the shared rate limit, retrying transient failures"""
+        import httpx
+        from notion_client.errors import HTTPResponseError, RequestTimeoutError
+        attempt = 0
+        while True:
+            self._record(requests=1, throttled=self.bucket.acquire())
+            try:
+                return method(**kwargs)
+            except HTTPResponseError as e:
+                if e.status not in self.RETRY_STATUSES or attempt >= self.max_retries:
+                    raise
+                error = e
+            except (RequestTimeoutError, httpx.TransportError) as e:
+                if attempt >= self.max_retries:
+                    raise
+                error = e
+            delay = self._retry_delay(attempt, error)
+            log.warning("Notion request failed (%s), retry %d/%d in %.1fs", error, attempt + 1, self.max_retries, delay)
+            self._record(retries=1, throttled=delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def metrics(self):
+        """Snapshot of the request, retry and throttling counters"""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'retries': self.retries,
+                'throttled_seconds': round(self.throttled_seconds, 3),
             }
+
+class _RateLimitedEndpoint:
+    """Routes every method of a Notion endpoint (databases, pages, ...) through RateLimitedNotion.call"""
+
+    def __init__(self, owner, endpoint):
+        self._owner = owner
+        self._endpoint = endpoint
+
+    def __getattr__(self, name):
+        method = getattr(self._endpoint, name)
+        def call(**kwargs):
+            return self._owner.call(method, **kwargs)
+        return call
+
+# Stage timings and counters of the current run
+metrics = RunMetrics()
+
+def count_response_bytes(response):
+    """httpx response hook: read the body now so the bytes received from Notion can be counted"""
+    response.read()
+    metrics.count('notion_bytes_received', response.num_bytes_downloaded)
+
+# Recording of this run's Notion responses when running with --record
+recording = None
+# True while --replay answers Notion from a recording: a request missing from it fails the run
+replaying = False
+
+# Section store of the current run, opened by main()
+section_store = None
+
+# Notion client, created on first use: importing notion_client/httpx and building
+# the HTTP connection pool dominate import time, and importers may never query Notion
+notion = None
+_notion_lock = threading.Lock()
+
+def get_notion():
+    """Process-wide rate-limited Notion client, built on first use"""
+    global notion
+    with _notion_lock:
+        if notion is None:
+            import httpx
+            from notion_client import Client
+            http_client = httpx.Client(event_hooks={'response': [count_response_bytes]})
+            options = {'auth': NOTION_TOKEN, 'client': http_client}
+            if NOTION_BASE_URL:
+                options['base_url'] = NOTION_BASE_URL
+            notion = RateLimitedNotion(Client(**options))
+        return notion
+
+def default_report():
+    """The single report configured through the environment"""
+    return Report(name=DEFAULT_REPORT_NAME, releases_db=DEV_RELEASES_DB, tasks_db=DEVELOPMENT_TASKS_DB)
+
+def recipient_index_path(report):
+    """RECIPIENT_INDEX_PATH for the default report, a per-report sibling file for the others"""
+    if not RECIPIENT_INDEX_PATH or report.name == DEFAULT_REPORT_NAME:
+        return RECIPIENT_INDEX_PATH
+    root, ext = os.path.splitext(RECIPIENT_INDEX_PATH)
+    return f"{root}.{report.name}{ext}"
+
+class RunSnapshot:
+    """Run-scoped view of the Notion data: each logical query is sent once and shared"""
+
+    def __init__(self, cache=None, full_refresh=False, report=None, now=None, personalized=False):
+        self.api_calls = 0
+        self.report = report or default_report()
+        # One clock reading per run, so every section's window is cut from the same instant
+        self.now = now or run_clock()
+        self._plan = None
+        self.cache = cache
+        self.full_refresh = full_refresh
+        self._results = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        # Per section: how many items were past SECTION_MAX_ITEMS, and (for personalized
+        # digests only) the cut releases that list recipients
+        self.personalized = personalized
+        self.omitted = {}
+        self.overflow = {}
+        # Recipients of the cut releases, reduced to release ids and addresses
+        self.listed = RecipientIndex()
+
+    def iter_pages(self, database_id, filter, page_size=None, sorts=None, properties=None):
+        """Lazily follow the query cursor, yielding one response page at a time"""
+        cursor = None
+        while True:
+            kwargs = {'database_id': database_id, 'page_size': page_size or NOTION_PAGE_SIZE}
+            if filter:
+                kwargs['filter'] = filter
+            if sorts:
+                kwargs['sorts'] = sorts
+            if properties:
+                kwargs['filter_properties'] = properties
+            if cursor:
+                kwargs['start_cursor'] = cursor
+            with self._lock:
+                self.api_calls += 1
+            response = get_notion().databases.query(**kwargs)
+            if recording is not None:
+                recording.add('databases.query', kwargs, response)
+            yield response
+            cursor = response.get('next_cursor')
+            if not response.get('has_more') or not cursor:
+                return
+
+    def iter_results(self, database_id, filter, page_size=None, sorts=None, properties=None):
+        """Yield the individual Notion pages of every response page as they arrive"""
+        for response in self.iter_pages(database_id, filter, page_size, sorts, properties):
+            yield from response['results']
+
+    def iter_matching(self, database_id, filter, sorts=None, properties=None, ordered=True):
+        """Yield the pages matching a filter, from the page cache when one is configured
+
+        Pages come in `sorts` order; with ordered=False cached pages stream
+        unsorted, for callers that order what they extract themselves.
+        """
+        property_ids = self.property_ids(database_id, properties) if properties else None
+        if self.cache is None:
+            yield from self.iter_results(database_id, filter, sorts=sorts, properties=property_ids)
+            return
+        self._fetch_once(f"sync:{database_id}", lambda snapshot: snapshot._sync(database_id, property_ids))
+        pages = self.cache.iter_pages(database_id, filter)
+        yield from sort_pages(pages, sorts) if sorts and ordered else pages
+
+    @property
+    def plan(self):
+        """{section: QueryGroup} for this run's report and time window"""
+        if self._plan is None:
+            self._plan = plan_queries(section_queries(self.report, self.now), merge=NOTION_MERGE_QUERIES)
+        return self._plan
+
+    def section_items(self, section):
+        """(items, omitted, overflow) of one section, from its own query or its share of a merged one
+
+        Pages stream through extraction into a bounded collector per section
+        (see collect_items), so neither raw pages nor more than
+        SECTION_MAX_ITEMS items of a section are ever held at once.
+        """
+        group = self.plan[section]
+        if not group.merged and len(group.members) == 1:
+            pages = self.iter_matching(group.database_id, group.filter, sorts=group.sorts,
+                                       properties=group.properties, ordered=False)
+            return collect_items(((section, page) for page in pages), group.members, snapshot=self)[section]
+        collected = self._fetch_once(f"query:{group.key}", lambda snapshot: snapshot._collect_group(group))
+        return collected[section]
+
+    def _collect_group(self, group):
+        """collect_items() of a shared query, whose pages are routed to the members whose filters match them"""
+        collected = collect_items(group.route(
+            self.iter_matching(group.database_id, group.filter, sorts=group.sorts,
+                               properties=group.properties, ordered=False)
+        ), group.members, snapshot=self)
+        if group.unrouted:
+            # The merged filter and the local evaluation of the members' filters disagree
+            log.warning("%d pages of %s matched none of the sections %s", group.unrouted, group.database_id,
+                        ", ".join(group.members))
+            metrics.count('pages_unrouted', group.unrouted)
+        return collected
+
+    def property_ids(self, database_id, names):
+        """Resolve property names (plus the title property) to ids for filter_properties; None disables projection"""
+        if not NOTION_PROJECT_PROPERTIES:
+            return None
+        schema = self._fetch_once(f"schema:{database_id}", lambda snapshot: snapshot._retrieve_schema(database_id))
+        if not schema:
+            return None
+        wanted = set(names)
+        return [prop['id'] for name, prop in schema.items() if name in wanted or prop.get('type') == 'title']
+
+    def _retrieve_schema(self, database_id):
+        try:
+            with self._lock:
+                self.api_calls += 1
+            response = get_notion().databases.retrieve(database_id=database_id)
+            if recording is not None:
+                recording.add('databases.retrieve', {'database_id': database_id}, response)
+            return response['properties']
+        except Exception as e:
+            if replaying and isinstance(e, LookupError):
+                raise
+            log.warning("Could not read the schema of %s, fetching all properties: %s", database_id, e)
+            return None
+
+    def _sync(self, database_id, property_ids=None):
+        mode = "full refresh" if self.full_refresh or not self.cache.watermark(database_id) else "incremental"
+        fetched = self.cache.sync(
+            database_id,
+            lambda filter: self.iter_results(database_id, filter, properties=property_ids),
+            full_refresh=self.full_refresh,
         )
+        log.info("Synced %d changed pages of %s into the cache (%s)", fetched, database_id, mode)
+        return fetched
+
+    def _fetch_once(self, key, fetch):
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._results:
+                self._results[key] = fetch(self)
+        return self._results[key]
+
+    def prefetch(self, max_workers=None):
+        """Run the independent section queries concurrently on a bounded thread pool"""
+        fetchers = SECTION_FETCHERS
+        workers = max(1, max_workers or NOTION_MAX_CONCURRENCY)
+        if workers == 1:
+            for key, fetch in fetchers.items():
+                self._fetch_once(key, fetch)
+            return
+        with ThreadPoolExecutor(max_workers=min(workers, len(fetchers))) as pool:
+            futures = [pool.submit(self._fetch_once, key, fetch) for key, fetch in fetchers.items()]
+        for future in futures:
+            future.result()
+
+    @property
+    def recent_launches(self):
+        return self._fetch_once('recent_launches', get_recent_launches)
+
+    @property
+    def upcoming_launches(self):
+        return self._fetch_once('upcoming_launches', get_upcoming_launches)
+
+    @property
+    def bug_fixes(self):
+        return self._fetch_once('bug_fixes', get_bug_fixes)
+
+    @property
+    def releases(self):
+        """Recent then upcoming launches, plus (for personalized digests) the cut ones that list recipients"""
+        recent, upcoming = self.recent_launches, self.upcoming_launches
+        return (recent + self.overflow.get('recent_launches', [])
+                + upcoming + self.overflow.get('upcoming_launches', []))
+
+    @property
+    def recipient_index(self):
+        return self._fetch_once('recipient_index',
+                                lambda snapshot: build_recipient_index(snapshot, recipient_index_path(snapshot.report)))
+
+# A single address: something@domain.tld, no whitespace or second '@'
+EMAIL_PATTERN = re.compile(r'[^@\s]+@[^@\s]+\.[^@\s]+')
+RECIPIENT_SEPARATORS = re.compile(r'[,;\n]')
+
+def parse_addresses(text):
+    """Split an 'Email To'/'Email CC' value into normalized (stripped, case-folded) valid addresses"""
+    addresses = []
+    for candidate in RECIPIENT_SEPARATORS.split(text):
+        address = candidate.replace(' ', '').casefold()
+        if address and EMAIL_PATTERN.fullmatch(address):
+            # The same few addresses recur on many releases; keep one copy of each
+            addresses.append(sys.intern(address))
+    return addresses
+
+class RecipientIndex:
+    """Deduplicated recipients keyed by address, remembering which release items listed them and how.
+
+    An address listed as To by any item is a To recipient; it is only CC when
+    no item lists it as To. The index is JSON-serialisable so it can be kept
+    between runs and updated incrementally.
+    """
+
+    ROLES = ('to', 'cc')
+
+    def __init__(self):
+        self._roles = {}    # address -> {'to': set(item ids), 'cc': set(item ids)}
+        self._by_item = {}  # item id -> set(addresses), for incremental updates
+
+    def __len__(self):
+        return len(self._roles)
+
+    def add_item(self, item):
+        """Index one ReleaseItem's Email To/Email CC in a single pass"""
+        for role, text in (('to', item.email_to), ('cc', item.email_cc)):
+            if not text:
+                continue
+            for address in parse_addresses(text):
+                self._roles.setdefault(address, {'to': set(), 'cc': set()})[role].add(item.id)
+                self._by_item.setdefault(item.id, set()).add(address)
+
+    def discard_item(self, item_id):
+        """Forget everything an item contributed, dropping addresses nobody else lists"""
+        for address in self._by_item.pop(item_id, ()):
+            roles = self._roles[address]
+            for ids in roles.values():
+                ids.discard(item_id)
+            if not any(roles.values()):
+                del self._roles[address]
+
+    def update(self, items):
+        """Re-index `items`, replacing whatever they contributed before"""
+        for item in items:
+            self.discard_item(item.id)
+            self.add_item(item)
+
+    def merge(self, other):
+        """Add everything another index holds, replacing what its items contributed here before"""
+        for item_id, addresses in other._by_item.items():
+            self.discard_item(item_id)
+            for address in addresses:
+                for role, ids in other._roles[address].items():
+                    if item_id in ids:
+                        self._roles.setdefault(address, {'to': set(), 'cc': set()})[role].add(item_id)
+                self._by_item.setdefault(item_id, set()).add(address)
+
+    def item_ids(self):
+        return list(self._by_item)
+
+    def retain(self, item_ids):
+        """Drop items that are no longer part of the report"""
+        for item_id in set(self._by_item) - set(item_ids):
+            self.discard_item(item_id)
+
+    @property
+    def to_recipients(self):
+        return sorted(address for address, roles in self._roles.items() if roles['to'])
+
+    @property
+    def cc_recipients(self):
+        return sorted(address for address, roles in self._roles.items() if roles['cc'] and not roles['to'])
+
+    def items_for(self, address):
+        """Ids of the release items that listed `address` in either role"""
+        roles = self._roles.get(address.casefold())
+        return roles['to'] | roles['cc'] if roles else set()
+
+    def to_dict(self):
+        return {address: {role: sorted(ids) for role, ids in roles.items()} for address, roles in self._roles.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls()
+        for address, roles in data.items():
+            index._roles[address] = {role: set(roles.get(role, ())) for role in cls.ROLES}
+            for ids in roles.values():
+                for item_id in ids:
+                    index._by_item.setdefault(item_id, set()).add(address)
+        return index
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                return cls.from_dict(json.load(file))
+        except FileNotFoundError:
+            return cls()
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, indent=1, sort_keys=True)
+
+def build_recipient_index(snapshot, path=None):
+    """Index the recipients of this run's releases, incrementally updating the saved index at `path` if given"""
+    items = snapshot.releases
+    # Releases cut by SECTION_MAX_ITEMS only left their ids and addresses behind
+    listed = snapshot.listed
+    log.debug("Found %d items that match date/status criteria", len(items))
+    if not path:
+        index = RecipientIndex()
+        for item in items:
+            index.add_item(item)
+        index.merge(listed)
+        return index
+
+    index = RecipientIndex.load(path)
+    previous = set(index.to_recipients) | set(index.cc_recipients)
+    index.update(items)
+    index.merge(listed)
+    index.retain([item.id for item in items] + listed.item_ids())
+    current = set(index.to_recipients) | set(index.cc_recipients)
+    log.info("Recipient index: %d new, %d dropped since last run", len(current - previous), len(previous - current))
+    index.save(path)
+    return index
+
+def get_recipients_from_releases(snapshot=None):
+    """Get email recipients from Dev Releases database based on recent/upcoming items"""
+    snapshot = snapshot or RunSnapshot()
+    report = snapshot.report
+    if report.to or report.cc:
+        log.info("Recipients from report %s - To: %d, CC: %d", report.name, len(report.to), len(report.cc))
+        return list(report.to), list(report.cc)
+    try:
+        index = snapshot.recipient_index
+        to_list = index.to_recipients
+        cc_list = index.cc_recipients
         
-        # Combine results
-        all_items = recent_response['results'] + upcoming_response['results']
-        
-        to_recipients = set()  # Use set to avoid duplicates
-        cc_recipients = set()
-        
-        print(f"DEBUG: Found {len(all_items)} items that match date/status criteria")
-        
-        for item in all_items:
-            properties = item['properties']
-            print(f"DEBUG: Processing item: {item.get('id', 'unknown')}")
-            
-            # Debug: Print all properties to see structure
-            if 'Email To' in properties:
-                print(f"DEBUG: Email To property exists: {properties['Email To']}")
-            else:
-                print("DEBUG: No 'Email To' property found")
-                
-            if 'Email CC' in properties:
-                print(f"DEBUG: Email CC property exists: {properties['Email CC']}")
-            else:
-                print("DEBUG: No 'Email CC' property found")
-            
-            # Extract To recipients
-            if 'Email To' in properties:
-                if properties['Email To'].get('rich_text'):
-                    # Handle rich text format
-                    email_text = ""
-                    for text_item in properties['Email To']['rich_text']:
-                        email_text += text_item['text']['content']
-                    
-                    if email_text.strip():
-                        print(f"DEBUG: Raw Email To text: '{email_text}'")
-                        # Split by comma and clean up each email
-                        emails = [e.strip() for e in email_text.split(',')]
-                        for email in emails:
-                            if email and '@' in email and '.' in email:
-                                # Remove any extra characters that might be present
-                                email = email.replace(' ', '')
-                                to_recipients.add(email)
-                                print(f"DEBUG: Added To recipient: {email}")
-                                
-                elif properties['Email To'].get('email'):
-                    # Handle email property format
-                    email = properties['Email To']['email'].strip()
-                    if email and '@' in email:
-                        to_recipients.add(email)
-                        print(f"DEBUG: Added To recipient (email property): {email}")
-            
-            # Extract CC recipients  
-            if 'Email CC' in properties:
-                if properties['Email CC'].get('rich_text'):
-                    # Handle rich text format
-                    email_text = ""
-                    for text_item in properties['Email CC']['rich_text']:
-                        email_text += text_item['text']['content']
-                    
-                    if email_text.strip():
-                        print(f"DEBUG: Raw Email CC text: '{email_text}'")
-                        # Split by comma and clean up each email
-                        emails = [e.strip() for e in email_text.split(',')]
-                        for email in emails:
-                            if email and '@' in email and '.' in email:
-                                # Remove any extra characters that might be present
-                                email = email.replace(' ', '')
-                                cc_recipients.add(email)
-                                print(f"DEBUG: Added CC recipient: {email}")
-                                
-                elif properties['Email CC'].get('email'):
-                    # Handle email property format
-                    email = properties['Email CC']['email'].strip()
-                    if email and '@' in email:
-                        cc_recipients.add(email)
-                        print(f"DEBUG: Added CC recipient (email property): {email}")
-        
-        # Convert sets back to lists
-        to_list = list(to_recipients)
-        cc_list = list(cc_recipients)
-        
-        print(f"Recipients from Dev Releases - To: {len(to_list)}, CC: {len(cc_list)}")
-        print(f"To recipients: {to_list}")
-        print(f"CC recipients: {cc_list}")
+        log.info("Recipients from Dev Releases - To: %d, CC: %d", len(to_list), len(cc_list))
+        log.debug("To recipients: %s", RedactedEmails(to_list))
+        log.debug("CC recipients: %s", RedactedEmails(cc_list))
         
         # If no recipients found in database, use fallback
         if not to_list and not cc_list:
-            print("No recipients found in Dev Releases, using fallback")
+            log.info("No recipients found in Dev Releases, using fallback")
             return FALLBACK_RECIPIENTS, FALLBACK_CC_RECIPIENTS
             
         return to_list, cc_list
         
     except Exception as e:
-        print(f"Error fetching recipients from Dev Releases: {e}")
-        print("Falling back to GitHub secrets")
+        log.error("Error fetching recipients from Dev Releases: %s", RedactedEmails(e))
+        log.info("Falling back to GitHub secrets")
         return FALLBACK_RECIPIENTS, FALLBACK_CC_RECIPIENTS
 
-def get_recent_launches():
-    """Get completed launches from the past week"""
-    one_week_ago = (datetime.now() - timedelta(days=7)).isoformat()
-    
-    try:
-        response = notion.databases.query(
-            database_id=DEV_RELEASES_DB,
-            filter={
-                "and": [
-                    {
-                        "property": "Status",
-                        "status": {
-                            "equals": "Completed"
-                        }
-                    },
-                    {
-                        "property": "Date",
-                        "date": {
-                            "after": one_week_ago
-                        }
-                    }
-                ]
-            }
-        )
-        print(f"DEBUG: Recent launches query returned {len(response['results'])} results")
-        if response['results']:
-            print(f"DEBUG: First result: {json.dumps(response['results'][0], indent=2)}")
-        return response['results']
-    except Exception as e:
-        print(f"Error fetching recent launches: {e}")
-        return []
+# Empty dates sort last in both directions, as in Notion
+NO_DATE = datetime.min.replace(tzinfo=timezone.utc)
 
-def get_upcoming_launches():
-    """Get upcoming launches for next 2 weeks"""
-    today = datetime.now().isoformat()
-    two_weeks_later = (datetime.now() + timedelta(days=14)).isoformat()
-    
+def item_order(query):
+    """TopN arguments ordering a section's items by date in the direction of its query's sort"""
+    descending = bool(query.sorts) and query.sorts[0].get('direction') == 'descending'
+    if descending:
+        return lambda item: (item.when is not None, item.when or NO_DATE), True
+    return lambda item: (item.when is None, item.when or NO_DATE), False
+
+def lists_recipients(item):
+    return bool(getattr(item, 'email_to', '') or getattr(item, 'email_cc', ''))
+
+def collect_items(routed, queries, limit=None, snapshot=None):
+    """Reduce (section, raw page) pairs to {section: (items, omitted, overflow)} as they stream in
+
+    No raw page outlives its extraction, and each section keeps only its first
+    `limit` (SECTION_MAX_ITEMS) items in date order in a TopN heap; the rest
+    are counted as omitted. Cut releases that list recipients are reduced to
+    their ids and addresses in the snapshot's `listed` index, so the recipient
+    list still sees them; for personalized digests they are kept whole in
+    `overflow` instead, as they lead the digests of the people they list.
+    """
+    limit = SECTION_MAX_ITEMS if limit is None else limit
+    keep_overflow = snapshot is not None and snapshot.personalized
+    collectors, overflow = {}, {}
+    for name, query in queries.items():
+        key, reverse = item_order(query)
+        collectors[name] = TopN(limit, key, reverse)
+        overflow[name] = TopN(0, key, reverse)
+    spent = 0.0
+    for name, page in routed:
+        query, collector = queries[name], collectors[name]
+        if not collector.seen and query.dump_label and log.isEnabledFor(logging.DEBUG):
+            # Only pay for serialising a full page when someone will read it
+            # Release pages carry the Email To/CC addresses, which must not reach the log
+            log.debug("%s: %s", query.dump_label, RedactedEmails(json.dumps(page, indent=2)))
+        started = time.perf_counter()
+        dropped = collector.add(query.extract(page))
+        if dropped is not None and lists_recipients(dropped):
+            if keep_overflow:
+                overflow[name].add(dropped)
+            elif snapshot is not None:
+                with snapshot._lock:
+                    snapshot.listed.add_item(dropped)
+        spent += time.perf_counter() - started
+    metrics.add_time('extract', spent)
+    return {name: (collector.items(), collector.omitted, overflow[name].items())
+            for name, collector in collectors.items()}
+
+def section_queries(report, now):
+    """Declarative definition of every section's query, all windows measured from `now`"""
+    since = (now - timedelta(days=report.lookback_days)).isoformat()
+    return {
+        'recent_launches': Query(
+            report.releases_db,
+            filter=all_of(any_of("Status", "status", report.recent_statuses), date_between("Date", after=since)),
+            sorts=[{"property": "Date", "direction": "descending"}],
+            properties=RELEASE_PROPERTIES,
+            extract=extract_release_data,
+            dump_label="First result",
+        ),
+        'upcoming_launches': Query(
+            report.releases_db,
+            filter=all_of(
+                any_of("Status", "status", report.upcoming_statuses),
+                date_between("Date", after=now.isoformat(),
+                             before=(now + timedelta(days=report.lookahead_days)).isoformat()),
+            ),
+            sorts=[{"property": "Date", "direction": "ascending"}],
+            properties=RELEASE_PROPERTIES,
+            extract=extract_release_data,
+        ),
+        'bug_fixes': Query(
+            report.tasks_db,
+            filter=all_of(
+                any_of("Type", "select", report.bug_types),
+                any_of("Status", "status", report.done_statuses),
+                date_between("Done Date", after=since),
+            ),
+            sorts=[{"property": "Done Date", "direction": "descending"}],
+            properties=TASK_PROPERTIES,
+            extract=extract_task_data,
+            dump_label="First bug fix result",
+        ),
+    }
+
+def get_section(snapshot, section, description):
+    """Extract one section's items; errors are logged and yield an empty section"""
     try:
-        response = notion.databases.query(
-            database_id=DEV_RELEASES_DB,
-            filter={
-                "and": [
-                    {
-                        "or": [
-                            {
-                                "property": "Status",
-                                "status": {
-                                    "equals": "Upcoming"
-                                }
-                            },
-                            {
-                                "property": "Status",
-                                "status": {
-                                    "equals": "In Progress"
-                                }
-                            }
-                        ]
-                    },
-                    {
-                        "property": "Date",
-                        "date": {
-                            "after": today,
-                            "before": two_weeks_later
-                        }
-                    }
-                ]
-            }
-        )
-        print(f"DEBUG: Upcoming launches query returned {len(response['results'])} results")
-        return response['results']
+        results, omitted, overflow = snapshot.section_items(section)
+        log.debug("%s query returned %d results", description, len(results) + omitted)
+        if omitted:
+            log.info("%s: kept the first %d of %d items (SECTION_MAX_ITEMS)", description, len(results),
+                     len(results) + omitted)
+        with snapshot._lock:
+            snapshot.omitted[section] = omitted
+            snapshot.overflow[section] = overflow
+        return results
     except Exception as e:
-        print(f"Error fetching upcoming launches: {e}")
+        if replaying and isinstance(e, LookupError):
+            # A replay missing a response would silently render an empty section
+            raise
+        log.error("Error fetching %s: %s", description.lower(), e)
         return []
 
-def get_bug_fixes():
-    """Get bug fixes from the past week"""
-    one_week_ago = (datetime.now() - timedelta(days=7)).isoformat()
-    
+def get_recent_launches(snapshot=None):
+    """Get completed launches from the report's lookback window (the past week by default)"""
+    return get_section(snapshot or RunSnapshot(), 'recent_launches', "Recent launches")
+
+def get_upcoming_launches(snapshot=None):
+    """Get upcoming launches for the report's lookahead window (the next 2 weeks by default)"""
+    return get_section(snapshot or RunSnapshot(), 'upcoming_launches', "Upcoming launches")
+
+def get_bug_fixes(snapshot=None):
+    """Get bug fixes from the report's lookback window (the past week by default)"""
+    return get_section(snapshot or RunSnapshot(), 'bug_fixes', "Bug fixes")
+
+# How RunSnapshot fetches each report section
+SECTION_FETCHERS = {
+    'recent_launches': get_recent_launches,
+    'upcoming_launches': get_upcoming_launches,
+    'bug_fixes': get_bug_fixes,
+}
+
+@dataclass
+class ReleaseItem:
+    """A Dev Releases row reduced to the fields the report uses"""
+    __slots__ = ('id', 'title', 'description', 'date', 'when', 'status', 'email_to', 'email_cc')
+    id: str
+    title: str
+    description: str
+    date: str
+    when: Optional[datetime]
+    status: str
+    email_to: str
+    email_cc: str
+
+@dataclass
+class BugFixItem:
+    """A Development Tasks bug row reduced to the fields the report uses"""
+    __slots__ = ('id', 'title', 'description', 'date', 'when', 'priority')
+    id: str
+    title: str
+    description: str
+    date: str
+    when: Optional[datetime]
+    priority: str
+
+def parse_item_date(date):
+    """Parse a Notion date string once at extraction; naive values are pinned to UTC so all items compare"""
+    if not date:
+        return None
     try:
-        response = notion.databases.query(
-            database_id=DEVELOPMENT_TASKS_DB,
-            filter={
-                "and": [
-                    {
-                        "property": "Type",
-                        "select": {
-                            "equals": "Bug"
-                        }
-                    },
-                    {
-                        "property": "Status",
-                        "status": {
-                            "equals": "Done"
-                        }
-                    },
-                    {
-                        "property": "Done Date",
-                        "date": {
-                            "after": one_week_ago
-                        }
-                    }
-                ]
-            }
-        )
-        print(f"DEBUG: Bug fixes query returned {len(response['results'])} results")
-        if response['results']:
-            print(f"DEBUG: First bug fix result: {json.dumps(response['results'][0], indent=2)}")
-        return response['results']
-    except Exception as e:
-        print(f"Error fetching bug fixes: {e}")
-        return []
+        return parse_datetime(date)
+    except ValueError:
+        return None
+
+def format_item_date(when, fmt, date=''):
+    """An item's date in REPORT_TIMEZONE (or its own offset), through the cached formatter
+
+    A date-only Notion value (`date` without a time) is a calendar day, not an
+    instant, so it is shown as is rather than shifted into another zone.
+    """
+    return format_datetime(when, fmt, None if is_date_only(date) else get_zone(REPORT_TIMEZONE))
+
+def format_run_date(now=None):
+    """The date an email is sent on, as shown in its header and subject"""
+    now = now or run_clock()
+    return format_datetime(now.astimezone(get_zone(REPORT_TIMEZONE)), '%B %d, %Y')
+
+def extract_email_text(prop):
+    """Raw recipient text of an 'Email To'/'Email CC' property (rich text or email type)"""
+    if not prop:
+        return ""
+    if prop.get('rich_text'):
+        return "".join(text_item['text']['content'] for text_item in prop['rich_text'])
+    if prop.get('email'):
+        return prop['email']
+    return ""
 
 def extract_release_data(page):
     """Extract data from a Dev Releases page"""
@@ -331,14 +892,18 @@ def extract_release_data(page):
         except (KeyError, TypeError):
             status = ""
     
-    print(f"DEBUG: Extracted release data - Title: {title}, Date: {date}, Status: {status}")
+    log.debug("Extracted release data - Title: %s, Date: %s, Status: %s", title, date, status)
     
-    return {
-        'title': title,
-        'description': description,
-        'date': date,
-        'status': status
-    }
+    return ReleaseItem(
+        id=page['id'],
+        title=title,
+        description=description,
+        date=date,
+        when=parse_item_date(date),
+        status=status,
+        email_to=extract_email_text(properties.get('Email To')),
+        email_cc=extract_email_text(properties.get('Email CC')),
+    )
 
 def extract_task_data(page):
     """Extract data from a Development Tasks page"""
@@ -388,17 +953,21 @@ def extract_task_data(page):
         except (KeyError, TypeError):
             priority = ""
     
-    print(f"DEBUG: Extracted task data - Title: {title}, Date: {date}, Priority: {priority}")
+    log.debug("Extracted task data - Title: %s, Date: %s, Priority: %s", title, date, priority)
     
-    return {
-        'title': title,
-        'description': description,
-        'date': date,
-        'priority': priority
-    }
+    return BugFixItem(
+        id=page['id'],
+        title=title,
+        description=description,
+        date=date,
+        when=parse_item_date(date),
+        priority=priority,
+    )
 
-def load_signature():
-    """Load email signature from file if it exists"""
+def load_signature(report=None):
+    """Load email signature from the report, a file if it exists, or EMAIL_SIGNATURE"""
+    if report is not None and report.signature is not None:
+        return report.signature
     try:
         # Try to read signature file from the repository
         signature_files = ['signature.html', 'signature.txt', 'email-signature.html']
@@ -408,7 +977,7 @@ def load_signature():
                 with open(filename, 'r', encoding='utf-8') as file:
                     signature_content = file.read().strip()
                     if signature_content:
-                        print(f"Loaded signature from {filename}")
+                        log.info("Loaded signature from %s", filename)
                         return signature_content
             except FileNotFoundError:
                 continue
@@ -419,140 +988,49 @@ def load_signature():
         
         return ""
     except Exception as e:
-        print(f"Error loading signature: {e}")
+        log.error("Error loading signature: %s", e)
         return EMAIL_SIGNATURE.replace('\\n', '<br>') if EMAIL_SIGNATURE else ""
 
-def format_email_content(recent_launches, upcoming_launches, bug_fixes):
-    """Format data into HTML email"""
-    
-    # Sort items by date
-    # Recent launches: sort by date descending (most recent first)
-    recent_launches = sorted(
-        recent_launches,
-        key=lambda x: x['properties'].get('Date', {}).get('date', {}).get('start', ''),
-        reverse=True
-    )
-    
-    # Upcoming launches: sort by date ascending (soonest first)
-    upcoming_launches = sorted(
-        upcoming_launches,
-        key=lambda x: x['properties'].get('Date', {}).get('date', {}).get('start', '')
-    )
-    
-    # Bug fixes: sort by done date descending (most recent first)
-    bug_fixes = sorted(
-        bug_fixes,
-        key=lambda x: x['properties'].get('Done Date', {}).get('date', {}).get('start', ''),
-        reverse=True
-    )
-    
-    # Load signature
-    signature_content = load_signature()
-    
-    html_content = f"""
+# HTML templates. Every section renders its items from ITEM_TEMPLATE (compiled
+# once per section); section-specific colours and labels come from SECTIONS.
+HEADER_TEMPLATE = """
     <html>
     <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 800px; margin: 0 auto;">
         <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin-bottom: 20px;">
-            <h1 style="color: #2c3e50; margin: 0;">Weekly Development Update</h1>
-            <p style="margin: 5px 0 0 0; color: #6c757d;"><strong>Date:</strong> {datetime.now().strftime('%B %d, %Y')}</p>
+            <h1 style="color: #2c3e50; margin: 0;">{title}</h1>
+            <p style="margin: 5px 0 0 0; color: #6c757d;"><strong>Date:</strong> {date}</p>
         </div>
-        
-        <h2 style="color: #28a745; border-bottom: 2px solid #28a745; padding-bottom: 5px;">🚀 Recent Launches ({len(recent_launches)} items)</h2>
-        """
-    
-    if recent_launches:
-        html_content += "<div style='background-color: #f8fff8; padding: 15px; border-radius: 5px; margin-bottom: 20px;'>"
-        for launch in recent_launches:
-            data = extract_release_data(launch)
-            formatted_date = ""
-            if data['date']:
-                try:
-                    date_obj = datetime.fromisoformat(data['date'].replace('Z', '+00:00'))
-                    formatted_date = date_obj.strftime('%B %d, %Y at %I:%M %p')
-                except:
-                    formatted_date = data['date']
-            
-            html_content += f"""
-            <div style="margin-bottom: 15px; padding: 10px; border-left: 4px solid #28a745;">
-                <h4 style="margin: 0 0 5px 0; color: #2c3e50;">{data['title']}</h4>
-                <p style="margin: 0 0 5px 0; font-size: 14px; color: #6c757d;">
-                    <strong>Released:</strong> {formatted_date} | <strong>Status:</strong> {data['status']}
-                </p>
-                <p style="margin: 0; color: #495057;">{data['description']}</p>
-            </div>
-            """
-        html_content += "</div>"
-    else:
-        html_content += "<p style='color: #6c757d; font-style: italic; background-color: #f8f9fa; padding: 15px; border-radius: 5px;'>No launches completed this week.</p>"
-    
-    html_content += f"""
-        <h2 style="color: #fd7e14; border-bottom: 2px solid #fd7e14; padding-bottom: 5px;">📅 Upcoming Launches ({len(upcoming_launches)} items)</h2>
         """
-    
-    if upcoming_launches:
-        html_content += "<div style='background-color: #fff8f0; padding: 15px; border-radius: 5px; margin-bottom: 20px;'>"
-        for launch in upcoming_launches:
-            data = extract_release_data(launch)
-            formatted_date = ""
-            if data['date']:
-                try:
-                    date_obj = datetime.fromisoformat(data['date'].replace('Z', '+00:00'))
-                    formatted_date = date_obj.strftime('%B %d, %Y at %I:%M %p')
-                except:
-                    formatted_date = data['date']
-            
-            html_content += f"""
-            <div style="margin-bottom: 15px; padding: 10px; border-left: 4px solid #fd7e14;">
-                <h4 style="margin: 0 0 5px 0; color: #2c3e50;">{data['title']}</h4>
-                <p style="margin: 0 0 5px 0; font-size: 14px; color: #6c757d;">
-                    <strong>Planned:</strong> {formatted_date} | <strong>Status:</strong> {data['status']}
-                </p>
-                <p style="margin: 0; color: #495057;">{data['description']}</p>
-            </div>
-            """
-        html_content += "</div>"
-    else:
-        html_content += "<p style='color: #6c757d; font-style: italic; background-color: #f8f9fa; padding: 15px; border-radius: 5px;'>No upcoming launches in the next 2 weeks.</p>"
-    
-    html_content += f"""
-        <h2 style="color: #dc3545; border-bottom: 2px solid #dc3545; padding-bottom: 5px;">🐛 Bug Fixes ({len(bug_fixes)} items)</h2>
+
+SECTION_HEADING_TEMPLATE = """
+        <h2 style="color: {color}; border-bottom: 2px solid {color}; padding-bottom: 5px;">{heading} ({count} items)</h2>
         """
-    
-    if bug_fixes:
-        html_content += "<div style='background-color: #fff5f5; padding: 15px; border-radius: 5px; margin-bottom: 20px;'>"
-        for fix in bug_fixes:
-            data = extract_task_data(fix)
-            formatted_date = ""
-            if data['date']:
-                try:
-                    date_obj = datetime.fromisoformat(data['date'].replace('Z', '+00:00'))
-                    formatted_date = date_obj.strftime('%B %d, %Y')
-                except:
-                    formatted_date = data['date']
-            
-            priority_badge = ""
-            if data['priority']:
-                priority_color = "#6c757d"
-                if data['priority'].lower() in ['high', 'critical']:
-                    priority_color = "#dc3545"
-                elif data['priority'].lower() == 'medium':
-                    priority_color = "#fd7e14" 
-                priority_badge = f"<span style='background-color: {priority_color}; color: white; padding: 2px 6px; border-radius: 3px; font-size: 12px;'>{data['priority']}</span>"
-            
-            html_content += f"""
-            <div style="margin-bottom: 15px; padding: 10px; border-left: 4px solid #dc3545;">
-                <h4 style="margin: 0 0 5px 0; color: #2c3e50;">{data['title']} {priority_badge}</h4>
+
+SECTION_OPEN_TEMPLATE = "<div style='background-color: {background}; padding: 15px; border-radius: 5px; margin-bottom: 20px;'>"
+
+SECTION_EMPTY_TEMPLATE = "<p style='color: #6c757d; font-style: italic; background-color: #f8f9fa; padding: 15px; border-radius: 5px;'>{message}</p>"
+
+ITEM_TEMPLATE = """
+            <div style="margin-bottom: 15px; padding: 10px; border-left: 4px solid {color};">
+                <h4 style="margin: 0 0 5px 0; color: #2c3e50;">{title}{badge}</h4>
                 <p style="margin: 0 0 5px 0; font-size: 14px; color: #6c757d;">
-                    <strong>Fixed:</strong> {formatted_date}
+                    <strong>{date_label}:</strong> {date}{status}
                 </p>
-                <p style="margin: 0; color: #495057;">{data['description']}</p>
+                <p style="margin: 0; color: #495057;">{description}</p>
             </div>
             """
-        html_content += "</div>"
-    else:
-        html_content += "<p style='color: #6c757d; font-style: italic; background-color: #f8f9fa; padding: 15px; border-radius: 5px;'>No bug fixes completed this week.</p>"
-    
-    html_content += """
+
+SECTION_MORE_TEMPLATE = "<p style='margin: 0; color: #6c757d; font-style: italic;'>…and {more}</p>"
+
+NO_CHANGES_TEMPLATE = "<p style='color: #495057; background-color: #f8f9fa; padding: 15px; border-radius: 5px;'>{message}</p>"
+
+NO_CHANGES_MESSAGE = "Nothing changed since the last update: no new launches, upcoming launches or bug fixes."
+
+STATUS_TEMPLATE = " | <strong>Status:</strong> {status}"
+
+PRIORITY_BADGE_TEMPLATE = " <span style='background-color: {color}; color: white; padding: 2px 6px; border-radius: 3px; font-size: 12px;'>{priority}</span>"
+
+FOOTER_TEMPLATE = """
         <hr style="margin: 30px 0; border: none; border-top: 1px solid #e9ecef;">
         <div style="background-color: #f8f9fa; padding: 15px; border-radius: 5px; text-align: center;">
             <p style="color: #6c757d; font-size: 14px; margin: 0;">
@@ -560,46 +1038,496 @@ def format_email_content(recent_launches, upcoming_launches, bug_fixes):
                 For questions or additional details, please reach out to the development team.
             </p>
         </div>"""
-    
-    # Add signature if provided
-    if signature_content:
-        html_content += f"""
+
+SIGNATURE_TEMPLATE = """
         <div style="margin-top: 30px; padding-top: 20px; border-top: 2px solid #e9ecef;">
             <div style="font-family: Arial, sans-serif; color: #495057;">
-                {signature_content}
+                {signature}
             </div>
         </div>"""
-    
-    html_content += """
+
+CLOSING_TEMPLATE = """
     </body>
     </html>
     """
-    
-    return html_content
 
-def send_email(content):
-    """Send the formatted email"""
-    # Get recipients from Dev Releases database
-    recipients, cc_recipients = get_recipients_from_releases()
-    
-    if not recipients and not cc_recipients:
-        print("No recipients configured!")
+NOTION_DATABASE_URL = 'https://www.notion.so/{id}'
+
+# Plain-text alternative, built from the same items as the HTML
+TEXT_HEADER_TEMPLATE = "{title}\nDate: {date}\n"
+
+TEXT_ITEM_TEMPLATE = "* {title}{priority}\n  {date_label}: {date}{status}\n{description}\n"
+
+TEXT_FOOTER = """
+--
+This weekly update was automatically generated from our Notion workspace.
+For questions or additional details, please reach out to the development team.
+"""
+
+HTML_BREAK = re.compile(r'<br\s*/?>|</(?:p|div|tr|h\d)>', re.IGNORECASE)
+HTML_TAG = re.compile(r'<[^>]+>')
+
+# 'database' names the Report field of the database a section's items come from
+SECTIONS = {
+    'recent_launches': {
+        'heading': '🚀 Recent Launches', 'color': '#28a745', 'background': '#f8fff8',
+        'date_label': 'Released', 'date_format': '%B %d, %Y at %I:%M %p',
+        'empty': 'No launches completed this week.', 'database': 'releases_db',
+    },
+    'upcoming_launches': {
+        'heading': '📅 Upcoming Launches', 'color': '#fd7e14', 'background': '#fff8f0',
+        'date_label': 'Planned', 'date_format': '%B %d, %Y at %I:%M %p',
+        'empty': 'No upcoming launches in the next 2 weeks.', 'database': 'releases_db',
+    },
+    'your_releases': {
+        'heading': '⭐ Your Releases', 'color': '#6f42c1', 'background': '#f8f5ff',
+        'date_label': 'Date', 'date_format': '%B %d, %Y at %I:%M %p',
+        'empty': 'None of this week\'s releases list you directly.', 'database': 'releases_db',
+    },
+    'bug_fixes': {
+        'heading': '🐛 Bug Fixes', 'color': '#dc3545', 'background': '#fff5f5',
+        'date_label': 'Fixed', 'date_format': '%B %d, %Y',
+        'empty': 'No bug fixes completed this week.', 'database': 'tasks_db',
+    },
+}
+
+PRIORITY_COLORS = {'high': '#dc3545', 'critical': '#dc3545', 'medium': '#fd7e14'}
+
+TEMPLATE_FIELD = re.compile(r'\{(\w+)\}')
+
+def compile_template(template, fields, **constants):
+    """Compile a {name} template into a %-format string taking `fields` positionally.
+
+    Constants are substituted at compile time, so rendering is a single C-level
+    % operation instead of re-parsing the template with str.format per item.
+    """
+    order = []
+    def substitute(match):
+        name = match.group(1)
+        if name in constants:
+            return str(constants[name]).replace('%', '%%')
+        order.append(name)
+        return '%s'
+    compiled = TEMPLATE_FIELD.sub(substitute, template.replace('%', '%%'))
+    if order != list(fields):
+        raise ValueError(f"Template fields {order} do not match {list(fields)}")
+    return compiled
+
+@functools.lru_cache(maxsize=None)
+def section_item_template(section):
+    """ITEM_TEMPLATE compiled once per section, with its colour and date label baked in"""
+    style = SECTIONS[section]
+    return compile_template(
+        ITEM_TEMPLATE,
+        ('title', 'badge', 'date', 'status', 'description'),
+        color=style['color'],
+        date_label=style['date_label'],
+    )
+
+def escape_text(text):
+    """HTML-escape text placed in element content; skips the copies when nothing needs escaping"""
+    if '&' in text or '<' in text or '>' in text:
+        return escape(text, quote=False)
+    return text
+
+@functools.lru_cache(maxsize=256)
+def priority_badge(priority):
+    """Priority badge markup; priorities repeat, so each one is rendered once"""
+    if not priority:
+        return ""
+    return PRIORITY_BADGE_TEMPLATE.format(
+        color=PRIORITY_COLORS.get(priority.lower(), "#6c757d"),
+        priority=escape_text(priority),
+    )
+
+@functools.lru_cache(maxsize=256)
+def status_fragment(status):
+    """Status suffix of a release's date line, rendered once per distinct status"""
+    return STATUS_TEMPLATE.format(status=escape_text(status)) if status else ""
+
+def render_items(section, items):
+    """Yield the HTML of each item of a section, one chunk per item"""
+    template = section_item_template(section)
+    date_format = SECTIONS[section]['date_format']
+    for item in items:
+        # Every piece of Notion text is HTML-escaped before it reaches the template
+        yield template % (
+            escape_text(item.title),
+            priority_badge(getattr(item, 'priority', "")),
+            escape_text(format_item_date(item.when, date_format, item.date) if item.when else item.date),
+            status_fragment(getattr(item, 'status', "")),
+            escape_text(item.description),
+        )
+
+def render_section(section, items, heading=None, omitted=0, more_url=None):
+    """Yield the HTML chunks of one report section, optionally under a report's own heading
+
+    `omitted` items were cut to keep the email under EMAIL_MAX_BYTES; they are
+    counted in the heading and summed up in an "and N more" line linking to `more_url`.
+    """
+    style = SECTIONS[section]
+    yield SECTION_HEADING_TEMPLATE.format(color=style['color'], heading=escape_text(heading or style['heading']),
+                                          count=len(items) + omitted)
+    if not items and not omitted:
+        yield SECTION_EMPTY_TEMPLATE.format(message=style['empty'])
         return
-    
-    msg = MIMEMultipart('alternative')
-    msg['Subject'] = f"Weekly Development Release Notes - {datetime.now().strftime('%B %d, %Y')}"
+    yield SECTION_OPEN_TEMPLATE.format(background=style['background'])
+    yield from render_items(section, items)
+    if omitted:
+        more = f"<a href=\"{escape(more_url)}\">{omitted} more in Notion</a>" if more_url else f"{omitted} more"
+        yield SECTION_MORE_TEMPLATE.format(more=more)
+    yield "</div>"
+
+def render_text_items(section, items):
+    """Yield the plain-text form of each item of a section, one chunk per item"""
+    style = SECTIONS[section]
+    for item in items:
+        priority = getattr(item, 'priority', "")
+        status = getattr(item, 'status', "")
+        yield TEXT_ITEM_TEMPLATE.format(
+            title=item.title,
+            priority=f" [{priority}]" if priority else "",
+            date_label=style['date_label'],
+            date=format_item_date(item.when, style['date_format'], item.date) if item.when else item.date,
+            status=f" | Status: {status}" if status else "",
+            description="  " + item.description.replace("\n", "\n  ") + "\n" if item.description else "",
+        )
+
+def render_text_section(section, items, heading=None, omitted=0, more_url=None):
+    """Yield the plain-text chunks of one report section (see render_section)"""
+    style = SECTIONS[section]
+    title = f"{heading or style['heading']} ({len(items) + omitted} items)"
+    yield f"\n{title}\n{'-' * len(title)}\n\n"
+    if not items and not omitted:
+        yield style['empty'] + "\n"
+        return
+    yield from render_text_items(section, items)
+    if omitted:
+        yield f"...and {omitted} more" + (f": {more_url}" if more_url else "") + "\n"
+
+def html_to_text(content):
+    """Rough plain-text version of a trusted HTML snippet such as the signature"""
+    text = HTML_BREAK.sub("\n", content)
+    text = unescape(HTML_TAG.sub("", text))
+    return "\n".join(line.strip() for line in text.splitlines()).strip()
+
+def render_header(title='Weekly Development Update', now=None):
+    return HEADER_TEMPLATE.format(title=escape_text(title), date=format_run_date(now))
+
+def render_text_header(title='Weekly Development Update', now=None):
+    return TEXT_HEADER_TEMPLATE.format(title=title, date=format_run_date(now))
+
+def render_report_sections(recent_launches, upcoming_launches, bug_fixes, headings=None):
+    """Yield the chunks of the three sections every recipient gets"""
+    headings = headings or {}
+    yield from render_section('recent_launches', recent_launches, headings.get('recent_launches'))
+    yield from render_section('upcoming_launches', upcoming_launches, headings.get('upcoming_launches'))
+    yield from render_section('bug_fixes', bug_fixes, headings.get('bug_fixes'))
+
+def render_closing(signature_content=""):
+    """Footer, optional signature and closing tags"""
+    # Signature is trusted HTML from the repo or secrets, so it is not escaped
+    signature = SIGNATURE_TEMPLATE.format(signature=signature_content) if signature_content else ""
+    return FOOTER_TEMPLATE + signature + CLOSING_TEMPLATE
+
+def render_text_closing(signature_content=""):
+    signature = "\n" + html_to_text(signature_content) + "\n" if signature_content else ""
+    return TEXT_FOOTER + signature
+
+def database_url(report, section):
+    """Notion link to the database a section's items come from, or None when it is not configured"""
+    database_id = getattr(report, SECTIONS[section]['database'])
+    return NOTION_DATABASE_URL.format(id=database_id.replace('-', '')) if database_id else None
+
+# Bump when the section rendering code changes, so stored fragments are rebuilt
+FRAGMENT_VERSION = 2
+
+@functools.lru_cache(maxsize=None)
+def templates_version():
+    """Hash of the templates and styles sections are rendered from; editing them invalidates stored fragments"""
+    parts = [str(FRAGMENT_VERSION), SECTION_HEADING_TEMPLATE, SECTION_OPEN_TEMPLATE, SECTION_EMPTY_TEMPLATE,
+             SECTION_MORE_TEMPLATE, ITEM_TEMPLATE, STATUS_TEMPLATE, PRIORITY_BADGE_TEMPLATE, TEXT_ITEM_TEMPLATE,
+             json.dumps([SECTIONS, PRIORITY_COLORS], sort_keys=True)]
+    return hashlib.sha1('\x1e'.join(parts).encode()).hexdigest()
+
+def fragment_key(section, items, heading=None):
+    """Key of a complete section's rendered fragment: its content hash plus everything else shaping the markup"""
+    parts = [templates_version(), section, content_hash(items), heading or '', REPORT_TIMEZONE]
+    return hashlib.sha1('\x1e'.join(parts).encode()).hexdigest()
+
+def render_fragment(section, items, heading=None, omitted=0, more_url=None):
+    """(html, text) of one section, taken from the section store while its items are unchanged"""
+    store = section_store
+    # Sections cut to fit EMAIL_MAX_BYTES vary with the budget, so only complete ones are stored
+    key = fragment_key(section, items, heading) if store is not None and not omitted else None
+    if key is not None:
+        fragment = store.fragment(key)
+        if fragment is not None:
+            metrics.count('fragments_reused')
+            return fragment
+    fragment = ("".join(render_section(section, items, heading, omitted, more_url)),
+                "".join(render_text_section(section, items, heading, omitted, more_url)))
+    if key is not None:
+        store.put_fragment(key, *fragment)
+    return fragment
+
+def render_sections(sections, report):
+    """HTML and plain text of (section, items, omitted) triples, under the report's headings"""
+    html, text = [], []
+    for section, items, omitted in sections:
+        heading = report.headings.get(section)
+        more_url = database_url(report, section) if omitted else None
+        fragment = render_fragment(section, items, heading, omitted, more_url)
+        html.append(fragment[0])
+        text.append(fragment[1])
+    return "".join(html), "".join(text)
+
+def render_no_changes():
+    """(html, text) body of the short digest sent when no section changed"""
+    return NO_CHANGES_TEMPLATE.format(message=NO_CHANGES_MESSAGE), f"\n{NO_CHANGES_MESSAGE}\n"
+
+def fit_sections(sections, budget):
+    """Cut (section, items, omitted) triples so the items' HTML and text take at most `budget` bytes
+
+    Sections are filled round-robin, so each keeps its first items and one huge
+    section cannot crowd out the others; what is cut is added to `omitted`.
+    """
+    sizes = []
+    for section, items, _ in sections:
+        item_sizes, total = [], 0
+        # Items past the budget on their own can never be kept, so they are not rendered
+        for html, text in zip(render_items(section, items), render_text_items(section, items)):
+            if total > budget:
+                break
+            item_sizes.append(len(html.encode()) + len(text.encode()))
+            total += item_sizes[-1]
+        sizes.append(item_sizes)
+    kept = [0] * len(sections)
+    used = 0
+    progress = True
+    while progress:
+        progress = False
+        for i, item_sizes in enumerate(sizes):
+            if kept[i] < len(item_sizes) and used + item_sizes[kept[i]] <= budget:
+                used += item_sizes[kept[i]]
+                kept[i] += 1
+                progress = True
+    return [(section, items[:count], omitted + len(items) - count)
+            for (section, items, omitted), count in zip(sections, kept)]
+
+def render_email_chunks(recent_launches, upcoming_launches, bug_fixes, signature_content="", report=None):
+    """Yield the email HTML as a stream of chunks, ready to be joined or written to a buffer"""
+    report = report or default_report()
+    yield render_header(report.title)
+    yield from render_report_sections(recent_launches, upcoming_launches, bug_fixes, report.headings)
+    yield render_closing(signature_content)
+
+def format_email_content(recent_launches, upcoming_launches, bug_fixes, report=None):
+    """Format data into HTML email"""
+    # Items arrive already ordered by the queries' sorts (Date/Done Date)
+    return "".join(render_email_chunks(recent_launches, upcoming_launches, bug_fixes, load_signature(report), report))
+
+def _smtp_transport():
+    from email_transport import SMTPTransport
+    return SMTPTransport(
+        SMTP_HOST, SMTP_PORT,
+        username=EMAIL_USER, password=EMAIL_PASS,
+        starttls=SMTP_STARTTLS,
+        pool_size=SMTP_POOL_SIZE,
+        max_recipients=SMTP_MAX_RECIPIENTS,
+        max_retries=SMTP_MAX_RETRIES,
+    )
+
+def _file_transport():
+    from email_transport import FileTransport
+    return FileTransport(EMAIL_FILE_DIR)
+
+# Transport factories keyed by EMAIL_TRANSPORT; each imports its module on first use
+TRANSPORTS = {
+    'smtp': _smtp_transport,
+    'file': _file_transport,
+}
+
+_transport = None
+_transport_lock = threading.Lock()
+
+def get_transport():
+    """Process-wide mail transport, created on first use so its connections are reused"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            if EMAIL_TRANSPORT not in TRANSPORTS:
+                raise ValueError(f"Unknown EMAIL_TRANSPORT {EMAIL_TRANSPORT!r}, expected one of {sorted(TRANSPORTS)}")
+            _transport = TRANSPORTS[EMAIL_TRANSPORT]()
+        return _transport
+
+def close_transport():
+    """Close the pooled connections of the process-wide transport"""
+    global _transport
+    with _transport_lock:
+        if _transport is not None:
+            _transport.close()
+            _transport = None
+
+def build_message(content, recipients, cc_recipients=(), subject='Weekly Development Release Notes - {date}', text=None,
+                  now=None):
+    """MIME message carrying the HTML report and its plain-text alternative"""
+    from email.message import EmailMessage
+    from email.policy import SMTP
+    msg = EmailMessage(policy=SMTP)
+    msg['Subject'] = subject.format(date=format_run_date(now))
     msg['From'] = EMAIL_USER
     
     # Set To and CC recipients
     if recipients:
         msg['To'] = ', '.join(recipients)
-        print(f"DEBUG: Setting To header: {', '.join(recipients)}")
+        log.debug("Setting To header: %s", RedactedEmails(recipients))
     if cc_recipients:
         msg['CC'] = ', '.join(cc_recipients)
-        print(f"DEBUG: Setting CC header: {', '.join(cc_recipients)}")
+        log.debug("Setting CC header: %s", RedactedEmails(cc_recipients))
+    
+    # Quoted-printable keeps the mostly-ASCII HTML close to its size (base64 adds a third)
+    text = text if text is not None else html_to_text(content)
+    msg.set_content(text, cte='quoted-printable')
+    msg.add_alternative(content, subtype='html', cte='quoted-printable')
+    # A boundary derived from the content keeps replayed previews byte-identical; QP
+    # encodes '=', so a boundary starting with '=' never occurs in the parts
+    digest = hashlib.sha1((content + text).encode()).hexdigest()
+    msg.set_boundary(f"=={digest}==")
+    return msg
+
+def write_message(msg, fp):
+    """Serialize a message straight into a binary file or buffer, with the CRLF line ends SMTP sends"""
+    from email.generator import BytesGenerator
+    BytesGenerator(fp, policy=msg.policy).flatten(msg)
+
+def message_bytes(msg):
+    """The message as the bytes handed to the transport"""
+    buffer = io.BytesIO()
+    write_message(msg, buffer)
+    return buffer.getvalue()
+
+def fit_message(sections, recipients, cc_recipients=(), report=None, signature_content="", rendered=None,
+                max_bytes=None, now=None, lead=("", "")):
+    """compose_message() that also returns the (section, items, omitted) triples it kept and their (html, text)
+
+    `lead` is already rendered (html, text) placed before the sections; it is
+    counted against `max_bytes` but never cut.
+    """
+    report = report or default_report()
+    max_bytes = EMAIL_MAX_BYTES if max_bytes is None else max_bytes
+    html_head = render_header(report.title, now) + lead[0]
+    text_head = render_text_header(report.title, now) + lead[1]
+    html_tail, text_tail = render_closing(signature_content), render_text_closing(signature_content)
+    
+    def serialize(html_body, text_body):
+        msg = build_message(html_head + html_body + html_tail, recipients, cc_recipients, report.subject,
+                            text=text_head + text_body + text_tail, now=now)
+        return message_bytes(msg)
+    
+    rendered = rendered or render_sections(sections, report)
+    fixed = len((html_head + html_tail + text_head + text_tail).encode())
+    raw = fixed + len(rendered[0].encode()) + len(rendered[1].encode())
+    # Encoding only adds bytes, so a body already over the limit is not worth serializing
+    if not max_bytes or raw <= max_bytes:
+        data = serialize(*rendered)
+        if not max_bytes or len(data) <= max_bytes:
+            return data, sections, rendered
+        budget = int(raw * max_bytes / len(data)) - fixed
+    else:
+        budget = max_bytes - fixed
+    total = sum(len(items) for _, items, _ in sections)
+    while True:
+        trimmed = fit_sections(sections, max(budget, 0))
+        rendered = render_sections(trimmed, report)
+        data = serialize(*rendered)
+        if len(data) <= max_bytes or budget <= 0:
+            break
+        # Encoding overhead varies a little with the content; tighten and try again
+        budget = min(int(budget * 0.95), budget - (len(data) - max_bytes))
+    kept = sum(len(items) for _, items, _ in trimmed)
+    metrics.count('messages_truncated')
+    if len(data) > max_bytes:
+        log.warning("Email is %d bytes even without items, over EMAIL_MAX_BYTES=%d", len(data), max_bytes)
+    else:
+        log.info("Email over %d bytes, kept %d of %d items", max_bytes, kept, total)
+    return data, trimmed, rendered
+
+def compose_message(sections, recipients, cc_recipients=(), report=None, signature_content="", rendered=None,
+                    max_bytes=None, now=None):
+    """Serialized digest of (section, items, omitted) triples, kept within `max_bytes` (EMAIL_MAX_BYTES)
+
+    `rendered` is the (html, text) of the sections when the caller already has
+    it. When the message is too big, sections are cut with fit_sections() to a
+    budget scaled by what headers and MIME encoding add, and re-checked.
+    """
+    return fit_message(sections, recipients, cc_recipients, report, signature_content, rendered, max_bytes, now)[0]
+
+def delivery_key(recipient=None, now=None, period=None, report=None):
+    """Idempotency key for this period's email (the ISO week by default) plus the report's databases (plus recipient)"""
+    report = report or default_report()
+    if period is None:
+        year, week, _ = (now or run_clock()).isocalendar()
+        period = f"{year}-W{week:02d}"
+    if report.name != DEFAULT_REPORT_NAME:
+        period = f"{period}/{report.name}"
+    key = f"{period}/{report.releases_db}/{report.tasks_db}"
+    return f"{key}/{recipient}" if recipient else key
+
+def open_outbox():
+    """Outbox at OUTBOX_PATH, or None when the outbox is disabled"""
+    return Outbox(OUTBOX_PATH, OUTBOX_RETENTION_DAYS) if OUTBOX_PATH else None
+
+def open_section_store():
+    """Section store at SECTION_STORE_PATH, or one that only lives for this run"""
+    return SectionStore(SECTION_STORE_PATH or ':memory:')
+
+def deliver_message(message, recipients, transport, outbox=None, key=None):
+    """Send serialized message bytes, recording them in the outbox first so a crash can be resumed
+
+    Returns False if the outbox says the message was already sent.
+    """
+    if outbox is None:
+        transport.send(message, EMAIL_USER, recipients, key=key)
+    elif outbox.enqueue(key, EMAIL_USER, recipients, message) == SENT:
+        return False
+    else:
+        outbox.deliver(key, transport)
+    metrics.count('messages_sent')
+    metrics.count('message_recipients', len(recipients))
+    metrics.count('message_bytes', len(message))
+    return True
+
+def report_sections(snapshot, recent_launches, upcoming_launches, bug_fixes):
+    """(section, items, omitted) triples of the shared sections, with the items SECTION_MAX_ITEMS cut"""
+    omitted = snapshot.omitted
+    return [('recent_launches', recent_launches, omitted.get('recent_launches', 0)),
+            ('upcoming_launches', upcoming_launches, omitted.get('upcoming_launches', 0)),
+            ('bug_fixes', bug_fixes, omitted.get('bug_fixes', 0))]
+
+def send_email(recent_launches, upcoming_launches, bug_fixes, snapshot=None, transport=None, outbox=None, period=None,
+               notice=False):
+    """Render the report into one email for every recipient and send it (just a no-changes note with `notice`)
+
+    Returns whether the email went out in this call.
+    """
+    snapshot = snapshot or RunSnapshot()
+    report = snapshot.report
+    # Get recipients from the report or the Dev Releases database
+    recipients, cc_recipients = get_recipients_from_releases(snapshot)
+    
+    if not recipients and not cc_recipients:
+        log.warning("No recipients configured!")
+        return False
     
-    html_part = MIMEText(content, 'html')
-    msg.attach(html_part)
+    # Items arrive already ordered by the queries' sorts (Date/Done Date)
+    with metrics.stage('render'):
+        if notice:
+            sections, rendered = [], render_no_changes()
+        else:
+            sections, rendered = report_sections(snapshot, recent_launches, upcoming_launches, bug_fixes), None
+        message = compose_message(sections, recipients, cc_recipients, report, load_signature(report), rendered,
+                                  now=snapshot.now)
     
     # Combine all recipients for actual sending
     all_recipients = []
@@ -608,59 +1536,503 @@ def send_email(content):
     if cc_recipients:
         all_recipients.extend([email.strip() for email in cc_recipients if email.strip()])
     
-    print(f"DEBUG: All recipients for sending: {all_recipients}")
+    log.debug("All recipients for sending: %s", RedactedEmails(all_recipients))
+    if not all_recipients:
+        log.warning("No recipients configured!")
+        return False
     
     try:
-        # Gmail SMTP configuration (adjust for other providers)
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(EMAIL_USER, EMAIL_PASS)
+        # Send to all recipients (both To and CC), batched by the transport
+        if not deliver_message(message, all_recipients, transport or get_transport(), outbox,
+                               delivery_key(now=snapshot.now, period=period, report=report)):
+            log.info("This period's email was already sent, skipping")
+            return False
         
-        # Send to all recipients (both To and CC)
-        if all_recipients:
-            text = msg.as_string()
-            server.sendmail(EMAIL_USER, all_recipients, text)
-        
-        server.quit()
-        print(f"Email sent successfully!")
-        print(f"To: {', '.join(recipients) if recipients else 'None'}")
-        print(f"CC: {', '.join(cc_recipients) if cc_recipients else 'None'}")
-        print(f"Total recipients: {len(all_recipients)}")
+        log.info("Email sent successfully!")
+        log.info("To: %s", RedactedEmails(recipients) if recipients else 'None')
+        log.info("CC: %s", RedactedEmails(cc_recipients) if cc_recipients else 'None')
+        log.info("Total recipients: %d", len(all_recipients))
+        return True
         
     except Exception as e:
-        print(f"Error sending email: {e}")
+        log.error("Error sending email: %s", RedactedEmails(e))
         raise e
 
-def main():
-    """Main function to orchestrate the email automation"""
-    print("Starting weekly email automation...")
-    print(f"Current date/time: {datetime.now().isoformat()}")
-    print(f"Looking for items after: {(datetime.now() - timedelta(days=7)).isoformat()}")
+def send_personalized_emails(recent_launches, upcoming_launches, bug_fixes, snapshot=None, transport=None, outbox=None,
+                             period=None, notice=False):
+    """Send every recipient their own digest, led by the releases that list them (a no-changes note with `notice`)
+
+    Returns whether any digest went out in this call.
+    """
+    snapshot = snapshot or RunSnapshot()
+    report = snapshot.report
+    transport = transport or get_transport()
+    index = snapshot.recipient_index
+    recipients = list(report.to + report.cc) or index.to_recipients + index.cc_recipients
+    # No release lists the fallback recipients, so their digest has no personal section
+    fallback = not recipients
+    if fallback:
+        log.info("No recipients found in Dev Releases, using fallback")
+        recipients = FALLBACK_RECIPIENTS + FALLBACK_CC_RECIPIENTS
+    if not recipients:
+        log.warning("No recipients configured!")
+        return False
+    
+    # Releases cut by SECTION_MAX_ITEMS still lead the digests of the people they list
+    overflow = snapshot.overflow
+    releases = (recent_launches + overflow.get('recent_launches', [])
+                + upcoming_launches + overflow.get('upcoming_launches', []))
+    
+    # Everything but the personal section is identical for everyone: render it once
+    with metrics.stage('render'):
+        shared = report_sections(snapshot, recent_launches, upcoming_launches, bug_fixes)
+        shared_html, shared_text = render_no_changes() if notice else render_sections(shared, report)
+        signature = load_signature(report)
+        personal = {}
+        if not notice and not fallback:
+            for address in recipients:
+                listed = index.items_for(address)
+                section = ('your_releases', [item for item in releases if item.id in listed], 0)
+                personal[address] = (section, render_sections([section], report))
+        if not notice and EMAIL_MAX_BYTES:
+            # Cut the shared sections once, to fit beside the largest personal section and the
+            # longest address, so no recipient's message has to be cut and re-rendered again
+            largest = max((rendered for _, rendered in personal.values()), default=("", ""),
+                          key=lambda rendered: len(rendered[0].encode()) + len(rendered[1].encode()))
+            _, shared, (shared_html, shared_text) = fit_message(
+                shared, [max(recipients, key=len)], report=report, signature_content=signature,
+                rendered=(shared_html, shared_text), now=snapshot.now, lead=largest)
+    
+    def deliver(address):
+        key = delivery_key(address, snapshot.now, period, report)
+        if outbox is not None and outbox.status(key) == SENT:
+            return False
+        if notice:
+            message = compose_message([], [address], report=report, signature_content=signature,
+                                      rendered=(shared_html, shared_text), now=snapshot.now)
+            return deliver_message(message, [address], transport, outbox, key)
+        section, (personal_html, personal_text) = personal.get(address, (None, ("", "")))
+        sections = ([section] if section else []) + shared
+        message = compose_message(sections, [address], report=report, signature_content=signature,
+                                  rendered=(personal_html + shared_html, personal_text + shared_text), now=snapshot.now)
+        return deliver_message(message, [address], transport, outbox, key)
+    
+    failures = skipped = 0
+    with ThreadPoolExecutor(max_workers=SMTP_POOL_SIZE) as pool:
+        futures = {pool.submit(deliver, address): address for address in recipients}
+        for future, address in futures.items():
+            try:
+                if not future.result():
+                    skipped += 1
+            except Exception as e:
+                failures += 1
+                log.error("Error sending digest to %s: %s", RedactedEmails(address), RedactedEmails(e))
+    
+    sent = len(recipients) - failures - skipped
+    log.info("Sent %d personalized digests, %d already sent this week, %d failed", sent, skipped, failures)
+    if failures:
+        raise RuntimeError(f"{failures} of {len(recipients)} personalized digests could not be sent")
+    return sent > 0
+
+def client_counters():
+    """The Notion client and mail transport in use, with their lifetime counters under run metric names"""
+    counters = {}
+    if isinstance(notion, RateLimitedNotion):
+        counters.update((f'notion_{name}', value) for name, value in notion.metrics().items())
+    transport = _transport
+    for name in ('connections_opened', 'retries', 'connect_seconds'):
+        if hasattr(transport, name):
+            counters[f'smtp_{name}'] = getattr(transport, name)
+    return notion, transport, counters
+
+def run_counters(baseline):
+    """How much the client counters grew since a client_counters() `baseline`; new clients count from zero"""
+    notion_then, transport_then, then = baseline
+    notion_now, transport_now, now = client_counters()
+    fresh = {'notion': notion_now is not notion_then, 'smtp': transport_now is not transport_then}
+    return {name: round(value - (0 if fresh[name.split('_', 1)[0]] else then.get(name, 0)), 3)
+            for name, value in now.items()}
+
+def record_run_metrics(baseline):
+    """Copy the Notion and SMTP counters of this run (since `baseline`) into the run metrics"""
+    counters = run_counters(baseline)
+    connect_seconds = counters.pop('smtp_connect_seconds', None)
+    for name, value in counters.items():
+        metrics.set(name, value)
+    if connect_seconds is not None:
+        metrics.add_time('smtp_connect', connect_seconds)
+
+def write_run_metrics(status):
+    """Write the run metrics to METRICS_PATH and the GitHub Actions step summary"""
+    log.info("Stage timings: %s", ", ".join(f"{name} {seconds:.2f}s" for name, seconds in metrics.stages.items()))
+    try:
+        if METRICS_PATH:
+            metrics.write_json(METRICS_PATH, status)
+        if os.getenv('GITHUB_STEP_SUMMARY'):
+            metrics.write_step_summary(os.getenv('GITHUB_STEP_SUMMARY'), status)
+    except OSError as e:
+        log.warning("Could not write run metrics: %s", e)
+
+def archive_sections(report, snapshot):
+    """Add the run's extracted sections to the weekly archive; a failure only costs this week's trend data"""
+    try:
+        WeeklyArchive(ARCHIVE_PATH).append(report.name, snapshot.now, {
+            'recent_launches': snapshot.recent_launches,
+            'upcoming_launches': snapshot.upcoming_launches,
+            'bug_fixes': snapshot.bug_fixes,
+        }, snapshot.omitted)
+    except Exception as e:
+        log.warning("Could not archive %s: %s", report.name, e)
+
+def trends(weeks=TREND_WEEKS):
+    """Print the trend report of every report from the weekly archive, without querying Notion"""
+    if not ARCHIVE_PATH:
+        log.warning("ARCHIVE_PATH is not set, no trends to report")
+        return
+    archive = WeeklyArchive(ARCHIVE_PATH)
+    summary = os.getenv('GITHUB_STEP_SUMMARY')
+    for report in load_report_definitions():
+        history = archive.read(report.name, weeks)
+        if not history:
+            log.info("No archived weeks for %s yet", report.name)
+            continue
+        text = format_trends(report.name, compute_trends(history))
+        print(text)
+        if summary:
+            with open(summary, 'a') as f:
+                f.write(text)
+
+def load_report_definitions():
+    """Reports from REPORTS_PATH, or the single report configured through the environment"""
+    return load_reports(REPORTS_PATH) if REPORTS_PATH else [default_report()]
+
+def run_report(report, mode, period=None, outbox=None, cache=None, full_refresh=False, tagged=False, now=None,
+               digest=None, archive=True):
+    """Fetch, render and send one report; returns 'ok', or 'skipped' if the outbox says it was already sent
+
+    With `tagged`, log lines and metrics are prefixed with the report name so
+    concurrent reports can be told apart. `now` is the run clock its windows
+    and delivery key are measured from. `digest` names the daemon digest being
+    sent, whose last sent sections are tracked apart from the report's others.
+    Without `archive` the run is left out of the weekly archive.
+    """
+    now = now or run_clock()
+    label = f"[{report.name}] " if tagged else ""
+    prefix = f"{report.name}." if tagged else ""
+    mode = report.mode or mode
+    if outbox is not None and mode != 'personalized':
+        key = delivery_key(now=now, period=period, report=report)
+        if outbox.status(key) == SENT:
+            log.info("%sThis period's email (%s) was already sent, nothing to do", label, key)
+            return 'skipped'
     
+    snapshot = RunSnapshot(cache=cache, full_refresh=full_refresh, report=report, now=now,
+                           personalized=mode == 'personalized')
     try:
-        print("Fetching recent launches from Dev Releases...")
-        recent_launches = get_recent_launches()
-        print(f"Found {len(recent_launches)} recent launches")
+        log.info("%sLooking for items after: %s", label, (now - timedelta(days=report.lookback_days)).isoformat())
+        log.info("%sFetching Dev Releases and Development Tasks (concurrency %d)...", label, NOTION_MAX_CONCURRENCY)
+        # Extraction streams inside the fetch, so 'fetch' includes the 'extract' time
+        with metrics.stage(prefix + 'fetch'):
+            snapshot.prefetch()
         
-        print("Fetching upcoming launches from Dev Releases...")
-        upcoming_launches = get_upcoming_launches()
-        print(f"Found {len(upcoming_launches)} upcoming launches")
+        recent_launches = snapshot.recent_launches
+        upcoming_launches = snapshot.upcoming_launches
+        bug_fixes = snapshot.bug_fixes
+        omitted = snapshot.omitted
+        # Counts include the items past SECTION_MAX_ITEMS, which were only counted
+        found = {'recent_launches': len(recent_launches) + omitted.get('recent_launches', 0),
+                 'upcoming_launches': len(upcoming_launches) + omitted.get('upcoming_launches', 0),
+                 'bug_fixes': len(bug_fixes) + omitted.get('bug_fixes', 0)}
+        log.info("%sFound %d recent launches", label, found['recent_launches'])
+        log.info("%sFound %d upcoming launches", label, found['upcoming_launches'])
+        log.info("%sFound %d bug fixes", label, found['bug_fixes'])
+        for section, count in found.items():
+            metrics.set(f"{prefix}items_{section}", count)
         
-        print("Fetching bug fixes from Development Tasks...")
-        bug_fixes = get_bug_fixes()
-        print(f"Found {len(bug_fixes)} bug fixes")
+        if ARCHIVE_PATH and archive:
+            with metrics.stage(prefix + 'archive'):
+                archive_sections(report, snapshot)
         
-        print("Formatting email content...")
-        email_content = format_email_content(recent_launches, upcoming_launches, bug_fixes)
+        hashes = {section: content_hash(items, count)
+                  for section, items, count in report_sections(snapshot, recent_launches, upcoming_launches, bug_fixes)}
+        notice = False
+        sent_name = f"{report.name}/{digest}" if digest else report.name
+        if section_store is not None and section_store.last_sent(sent_name) == hashes:
+            log.info("%sNo section changed since the last digest (UNCHANGED_DIGEST=%s)", label, UNCHANGED_DIGEST)
+            if UNCHANGED_DIGEST == 'skip':
+                return 'skipped'
+            notice = UNCHANGED_DIGEST == 'notice'
         
-        print("Sending email...")
-        send_email(email_content)
+        if mode == 'personalized':
+            log.info("%sSending personalized digests...", label)
+            with metrics.stage(prefix + 'send'):
+                sent = send_personalized_emails(recent_launches, upcoming_launches, bug_fixes, snapshot,
+                                                outbox=outbox, period=period, notice=notice)
+        else:
+            log.info("%sSending email...", label)
+            with metrics.stage(prefix + 'send'):
+                sent = send_email(recent_launches, upcoming_launches, bug_fixes, snapshot, outbox=outbox,
+                                  period=period, notice=notice)
+        # Only what recipients actually received is what the next digest is compared with
+        if sent and section_store is not None:
+            section_store.record_sent(sent_name, hashes)
+        return 'ok'
+    finally:
+        log.info("%sNotion API calls: %d", label, snapshot.api_calls)
+        metrics.count('notion_api_calls', snapshot.api_calls)
+
+def main(full_refresh=NOTION_FULL_REFRESH, mode=None, period=None, cache=None, keep_connections=False, now=None,
+         digest=None, report_names=(), lookback_days=None):
+    """Main function to orchestrate the email automation
+
+    Every report in REPORTS_PATH (or the one from the environment) is run,
+    REPORT_CONCURRENCY at a time, all sharing the Notion rate limit and the
+    SMTP pool. The daemon passes its own digest `mode`, outbox `period`, a page
+    `cache` that outlives the run, keep_connections=True to leave the SMTP
+    pool open, the `digest` name and the digest's `report_names` and
+    `lookback_days`. `now` pins the run clock, as replays do.
+    """
+    log.info("Starting weekly email automation...")
+    # One clock for the whole run, so every report and section agrees on "now"
+    now = now or run_clock()
+    log.info("Current date/time: %s", now.isoformat())
+    metrics.reset()
+    # The daemon keeps its Notion client and SMTP pool across runs; only this run's share is reported
+    baseline = client_counters()
+    
+    mode = mode or EMAIL_MODE
+    reports = select_reports(load_report_definitions(), report_names, lookback_days)
+    # A shorter or longer window than the report's own would distort its weekly trends
+    archive = lookback_days is None
+    global section_store
+    outbox = open_outbox()
+    section_store = open_section_store()
+    owns_cache = cache is None
+    if owns_cache:
+        cache = PageCache(NOTION_CACHE_PATH, NOTION_CACHE_RETENTION_DAYS, NOTION_CACHE_TTL) if NOTION_CACHE_PATH else None
+    status = 'failed'
+    try:
+        if len(reports) == 1:
+            results = [run_report(reports[0], mode, period, outbox, cache, full_refresh, now=now, digest=digest,
+                                  archive=archive)]
+        else:
+            log.info("Running %d reports, %d at a time", len(reports), REPORT_CONCURRENCY)
+            with ThreadPoolExecutor(max_workers=min(REPORT_CONCURRENCY, len(reports))) as pool:
+                futures = {report.name: pool.submit(run_report, report, mode, period, outbox, cache, full_refresh,
+                                                    True, now, digest, archive)
+                           for report in reports}
+            results, failed = [], []
+            for name, future in futures.items():
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    failed.append(name)
+                    log.error("Report %s failed: %s", name, RedactedEmails(e))
+            if failed:
+                raise RuntimeError(f"{len(failed)} of {len(reports)} reports failed: {', '.join(failed)}")
         
-        print("Weekly email automation completed successfully!")
+        if isinstance(notion, RateLimitedNotion):
+            limiter = run_counters(baseline)
+            log.info("Notion requests: %d, retries: %d, throttled: %ss",
+                     limiter['notion_requests'], limiter['notion_retries'], limiter['notion_throttled_seconds'])
+        status = 'skipped' if all(result == 'skipped' for result in results) else 'ok'
+        log.info("Weekly email automation completed successfully!")
         
     except Exception as e:
-        print(f"Error in main execution: {e}")
+        log.error("Error in main execution: %s", RedactedEmails(e))
         raise e
+    finally:
+        record_run_metrics(baseline)
+        if not keep_connections:
+            close_transport()
+        if owns_cache and cache is not None:
+            cache.close()
+        if outbox is not None:
+            outbox.close()
+        section_store.close()
+        section_store = None
+        write_run_metrics(status)
+
+def resume():
+    """Deliver the outbox's pending and failed messages without querying Notion"""
+    outbox = open_outbox()
+    if outbox is None:
+        log.warning("OUTBOX_PATH is not set, nothing to resume")
+        return
+    try:
+        sent, failed = outbox.flush(get_transport())
+        log.info("Outbox resume: %d delivered, %d still failing", sent, failed)
+        if failed:
+            raise RuntimeError(f"{failed} outbox messages could not be delivered")
+    finally:
+        close_transport()
+        outbox.close()
+
+@contextlib.contextmanager
+def overridden_settings(**settings):
+    """Replace module-level settings for the duration of a block, then restore them
+
+    The mail transport is dropped on the way in and out, so one built from the
+    previous settings is never reused.
+    """
+    saved = {name: globals()[name] for name in settings}
+    close_transport()
+    globals().update(settings)
+    try:
+        yield
+    finally:
+        close_transport()
+        globals().update(saved)
+
+def record_run(path, run):
+    """Call run(now) with the clock pinned while recording its Notion responses, then save them to `path`"""
+    from replay import Recording
+    # Cache syncs ask for the changes since a watermark, which a replay could not reproduce
+    with overridden_settings(NOTION_CACHE_PATH=None, recording=Recording(run_clock())):
+        try:
+            return run(recording.now)
+        finally:
+            recording.save(path)
+            log.info("Recorded %d Notion responses to %s", len(recording.responses), path)
+
+def dry_run(output, replay_path=None, golden=None, now=None):
+    """Write every report's emails to `output` as .eml, .html and .txt files instead of sending them
+
+    With `replay_path` the Notion responses and the clock come from a --record
+    file, so no network is used and the output is reproducible. Returns the
+    differences from the `golden` directory (empty when it matches or is not given).
+    """
+    from replay import Recording, ReplayNotion, compare_directories
+    # Nothing is delivered, so nothing may be marked sent or archived
+    settings = dict(EMAIL_TRANSPORT='file', EMAIL_FILE_DIR=output, OUTBOX_PATH='', ARCHIVE_PATH='',
+                    SECTION_STORE_PATH='')
+    if replay_path:
+        replayed = Recording.load(replay_path)
+        settings.update(notion=ReplayNotion(replayed), NOTION_CACHE_PATH=None, replaying=True)
+        now = replayed.now
+    with overridden_settings(**settings):
+        main(now=now)
+    if not golden:
+        return []
+    differences = compare_directories(output, golden)
+    for difference in differences:
+        log.error("Output differs from %s:\n%s", golden, difference)
+    if not differences:
+        log.info("Output matches %s", golden)
+    return differences
+
+def select_reports(reports, names=(), lookback_days=None):
+    """The reports called `names` (all of them when empty), looking back `lookback_days` if given"""
+    if names:
+        by_name = {report.name: report for report in reports}
+        unknown = [name for name in names if name not in by_name]
+        if unknown:
+            raise ValueError(f"Unknown reports: {', '.join(unknown)}")
+        reports = [by_name[name] for name in names]
+    if lookback_days is not None:
+        reports = [replace(report, lookback_days=lookback_days) for report in reports]
+    return reports
+
+@dataclass
+class Digest:
+    """One DIGESTS entry: its schedule, mode, reports (all when empty) and lookback window"""
+    name: str
+    schedule: CronSchedule
+    mode: str
+    reports: Tuple[str, ...] = ()
+    lookback_days: Optional[int] = None
+
+def parse_digests(text):
+    """A Digest for each 'name=<cron> [mode] [reports=a,b] [days=N]' entry of a DIGESTS string"""
+    digests = []
+    for entry in text.split(';'):
+        if not entry.strip():
+            continue
+        name, _, spec = entry.partition('=')
+        name = name.strip()
+        fields = spec.split()
+        cron_fields = 1 if fields and fields[0].startswith('@') else 5
+        digest = Digest(name, CronSchedule(' '.join(fields[:cron_fields])), EMAIL_MODE)
+        for option in fields[cron_fields:]:
+            key, _, value = option.partition('=')
+            if not value:
+                digest.mode = key.lower()
+            elif key == 'reports':
+                digest.reports = tuple(report for report in value.split(',') if report)
+            elif key == 'days' and value.isdigit() and int(value) > 0:
+                digest.lookback_days = int(value)
+            else:
+                raise ValueError(f"Invalid option {option!r} for digest {name!r}")
+        if digest.mode not in ('shared', 'personalized'):
+            raise ValueError(f"Unknown mode {digest.mode!r} for digest {name!r}")
+        digests.append(digest)
+    if not digests:
+        raise ValueError("DIGESTS does not define any digest")
+    return digests
+
+def serve():
+    """Stay resident and send every digest in DIGESTS on its schedule, reusing connections and cached pages"""
+    digests = parse_digests(DIGESTS)
+    # Fail at startup, not at the first firing, when a digest names a report that does not exist
+    reports = load_report_definitions()
+    for digest in digests:
+        select_reports(reports, digest.reports)
+    if NOTION_CACHE_PATH:
+        cache = PageCache(NOTION_CACHE_PATH, NOTION_CACHE_RETENTION_DAYS, NOTION_CACHE_TTL)
+    else:
+        cache = MemoryPageCache(NOTION_MEMORY_CACHE_TTL, NOTION_CACHE_RETENTION_DAYS)
+    
+    def job(digest):
+        def run(fire_time):
+            main(mode=digest.mode, period=f"{digest.name}/{fire_time:%Y-%m-%dT%H:%M}", cache=cache,
+                 keep_connections=True, digest=digest.name, report_names=digest.reports,
+                 lookback_days=digest.lookback_days)
+        return run
+    
+    scheduler = Scheduler([(digest.name, digest.schedule, job(digest)) for digest in digests])
+    signal.signal(signal.SIGTERM, lambda signum, frame: scheduler.stop())
+    log.info("Daemon started with %d digests", len(digests))
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close_transport()
+        cache.close()
+        log.info("Daemon stopped")
 
 if __name__ == "__main__":
-    main()
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Send the weekly development update email")
+    parser.add_argument("--full-refresh", action="store_true", default=NOTION_FULL_REFRESH,
+                        help="ignore the sync watermark and refetch every page into the cache")
+    parser.add_argument("--resume", action="store_true",
+                        help="only deliver messages left pending or failed in the outbox by earlier runs")
+    parser.add_argument("--daemon", action="store_true",
+                        help="stay running and send the digests in DIGESTS on their cron schedules")
+    parser.add_argument("--trends", action="store_true",
+                        help="print velocity, priority mix and slip rate per week from the archive and exit")
+    parser.add_argument("--weeks", type=int, default=TREND_WEEKS, help="weeks covered by --trends")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="write every email to --out as .eml, .html and .txt files instead of sending it")
+    parser.add_argument("--out", default=EMAIL_FILE_DIR, help="directory the dry run writes to")
+    parser.add_argument("--record", metavar="FILE", help="save the run's Notion responses and clock to FILE")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="dry run answered from a --record FILE instead of Notion, without network")
+    parser.add_argument("--golden", metavar="DIR",
+                        help="after a dry run, exit with status 1 if the output differs from the files in DIR")
+    args = parser.parse_args()
+    with profiled(PROFILE_PATH):
+        if args.trends:
+            trends(args.weeks)
+        elif args.daemon:
+            serve()
+        elif args.resume:
+            resume()
+        else:
+            if args.dry_run or args.replay:
+                run = lambda now: dry_run(args.out, args.replay, args.golden, now)
+            else:
+                run = lambda now: main(full_refresh=args.full_refresh, now=now)
+            if record_run(args.record, run) if args.record else run(None):
+                sys.exit(1)
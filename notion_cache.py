@@ -0,0 +1,282 @@
+"""Caches of Notion database pages for incremental syncs.
+
+PageCache mirrors each database into SQLite keyed by page id and
+last_edited_time; MemoryPageCache keeps the mirror in memory for a long-lived
+process. A sync only asks Notion for pages edited since the previous sync
+watermark; the report queries are then answered locally with
+page_matches_filter(). Database queries do not return archived or trashed
+pages, so an incremental sync never sees them go: both caches expire a
+database's mirror `ttl` seconds after its last full sync, and the next sync
+refetches everything.
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+from dates import parse_utc
+
+# Notion stores last_edited_time at minute precision, so the watermark is
+# rewound a little to never miss an edit made during the previous sync.
+WATERMARK_SKEW = timedelta(minutes=2)
+
+# Cached pages read per SQLite query by PageCache.iter_pages()
+FETCH_BATCH = 500
+
+
+def parse_notion_datetime(value):
+    """Parse a Notion date/datetime string into an aware UTC datetime (naive values are taken as UTC)"""
+    return parse_utc(value) if value else None
+
+
+def _property_value(prop):
+    """Comparable value of a status/select/date property, or None"""
+    if not prop:
+        return None
+    for kind in ('status', 'select'):
+        if prop.get(kind):
+            return prop[kind].get('name')
+    if prop.get('date'):
+        return parse_notion_datetime(prop['date'].get('start'))
+    return None
+
+
+def _compare(value, condition):
+    for op, expected in condition.items():
+        if op == 'equals':
+            if isinstance(value, datetime):
+                if value != parse_notion_datetime(expected):
+                    return False
+            elif value != expected:
+                return False
+        elif op == 'does_not_equal':
+            if value == expected:
+                return False
+        elif op == 'is_empty':
+            if value is not None:
+                return False
+        elif op == 'is_not_empty':
+            if value is None:
+                return False
+        elif op in ('after', 'before', 'on_or_after', 'on_or_before'):
+            if value is None:
+                return False
+            bound = parse_notion_datetime(expected)
+            if op == 'after' and not value > bound:
+                return False
+            if op == 'before' and not value < bound:
+                return False
+            if op == 'on_or_after' and not value >= bound:
+                return False
+            if op == 'on_or_before' and not value <= bound:
+                return False
+        else:
+            raise ValueError(f"Unsupported filter condition: {op}")
+    return True
+
+
+def page_matches_filter(page, filter):
+    """Evaluate the subset of the Notion filter grammar used by the reports against one page"""
+    if not filter:
+        return True
+    if 'and' in filter:
+        return all(page_matches_filter(page, clause) for clause in filter['and'])
+    if 'or' in filter:
+        return any(page_matches_filter(page, clause) for clause in filter['or'])
+    if 'timestamp' in filter:
+        timestamp = filter['timestamp']
+        return _compare(parse_notion_datetime(page.get(timestamp)), filter[timestamp])
+    if 'property' in filter:
+        prop = page.get('properties', {}).get(filter['property'])
+        for kind in ('status', 'select', 'date'):
+            if kind in filter:
+                return _compare(_property_value(prop), filter[kind])
+    raise ValueError(f"Unsupported filter: {filter}")
+
+
+def sort_pages(pages, sorts):
+    """Order pages by a Notion `sorts` spec; as in Notion, empty values sort last"""
+    pages = list(pages)
+    for spec in reversed(sorts):
+        if 'timestamp' in spec:
+            key = lambda page, name=spec['timestamp']: parse_notion_datetime(page.get(name))
+        else:
+            key = lambda page, name=spec['property']: _property_value(page.get('properties', {}).get(name))
+        keyed = [(key(page), page) for page in pages]
+        present = [item for item in keyed if item[0] is not None]
+        present.sort(key=lambda item: item[0], reverse=spec.get('direction') == 'descending')
+        pages = [page for _, page in present] + [page for value, page in keyed if value is None]
+    return pages
+
+
+def _reference_date(page):
+    """Newest date that keeps a page relevant: its Date/Done Date, else its last edit"""
+    dates = []
+    for prop in page.get('properties', {}).values():
+        if prop and prop.get('type', 'date') == 'date' and prop.get('date'):
+            dates.append(parse_notion_datetime(prop['date'].get('start')))
+    dates = [d for d in dates if d]
+    if not dates:
+        dates.append(parse_notion_datetime(page.get('last_edited_time')) or datetime.now(timezone.utc))
+    return max(dates)
+
+
+class PageCache:
+    """SQLite mirror of Notion database pages with a per-database sync watermark"""
+
+    def __init__(self, path, retention_days=60, ttl=7 * 86400):
+        self.path = path
+        self.retention = timedelta(days=retention_days)
+        self.ttl = timedelta(seconds=ttl)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS pages ('
+                ' database_id TEXT NOT NULL, page_id TEXT NOT NULL, last_edited_time TEXT,'
+                ' reference_date TEXT NOT NULL, payload TEXT NOT NULL,'
+                ' PRIMARY KEY (database_id, page_id))'
+            )
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS sync_state ('
+                ' database_id TEXT PRIMARY KEY, watermark TEXT NOT NULL, synced_at TEXT NOT NULL,'
+                ' full_synced_at TEXT)'
+            )
+            columns = [row[1] for row in self._db.execute('PRAGMA table_info(sync_state)')]
+            if 'full_synced_at' not in columns:
+                # Caches written before full syncs were tracked get a full sync next
+                self._db.execute('ALTER TABLE sync_state ADD COLUMN full_synced_at TEXT')
+
+    def watermark(self, database_id):
+        """Where the next incremental sync starts, or None once the last full sync is older than `ttl`"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT watermark, full_synced_at FROM sync_state WHERE database_id = ?', (database_id,)
+            ).fetchone()
+        if not row or not row[1] or datetime.now(timezone.utc) - parse_notion_datetime(row[1]) > self.ttl:
+            return None
+        return row[0]
+
+    def sync(self, database_id, fetch, full_refresh=False):
+        """Refresh one database from `fetch(filter)`, an iterator of pages; returns the number of pages fetched"""
+        started = datetime.now(timezone.utc)
+        watermark = None if full_refresh else self.watermark(database_id)
+        filter = None
+        if watermark:
+            filter = {'timestamp': 'last_edited_time', 'last_edited_time': {'on_or_after': watermark}}
+
+        fetched = 0
+        upserts, deletes = [], []
+        for page in fetch(filter):
+            fetched += 1
+            if page.get('archived') or page.get('in_trash'):
+                deletes.append((database_id, page['id']))
+                continue
+            upserts.append((
+                database_id, page['id'], page.get('last_edited_time'),
+                _reference_date(page).isoformat(), json.dumps(page, separators=(',', ':')),
+            ))
+
+        new_watermark = (started - WATERMARK_SKEW).replace(microsecond=0).isoformat()
+        cutoff = (started - self.retention).isoformat()
+        with self._lock, self._db:
+            if watermark is None:
+                # Full refresh: anything not returned has been archived or deleted
+                self._db.execute('DELETE FROM pages WHERE database_id = ?', (database_id,))
+                full_synced_at = started.isoformat()
+            else:
+                full_synced_at = self._db.execute(
+                    'SELECT full_synced_at FROM sync_state WHERE database_id = ?', (database_id,)
+                ).fetchone()[0]
+            self._db.executemany('DELETE FROM pages WHERE database_id = ? AND page_id = ?', deletes)
+            self._db.executemany('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)', upserts)
+            self._db.execute('DELETE FROM pages WHERE database_id = ? AND reference_date < ?', (database_id, cutoff))
+            self._db.execute(
+                'INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?)',
+                (database_id, new_watermark, started.isoformat(), full_synced_at),
+            )
+        return fetched
+
+    def iter_pages(self, database_id, filter=None):
+        """Yield cached pages of a database that match a Notion filter"""
+        # Read a batch at a time in page id order, so a large database is never held in memory
+        # at once and no cursor stays open while other threads write
+        last = ''
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    'SELECT page_id, payload FROM pages WHERE database_id = ? AND page_id > ?'
+                    ' ORDER BY page_id LIMIT ?', (database_id, last, FETCH_BATCH)
+                ).fetchall()
+            if not rows:
+                return
+            last = rows[-1][0]
+            for _, payload in rows:
+                page = json.loads(payload)
+                if page_matches_filter(page, filter):
+                    yield page
+
+    def close(self):
+        self._db.close()
+
+
+class MemoryPageCache:
+    """In-memory page mirror with the PageCache interface, for the daemon"""
+
+    def __init__(self, ttl=86400, retention_days=60):
+        self.ttl = timedelta(seconds=ttl)
+        self.retention = timedelta(days=retention_days)
+        self._lock = threading.Lock()
+        self._pages = {}
+        self._watermarks = {}
+        self._full_synced_at = {}
+
+    def watermark(self, database_id):
+        with self._lock:
+            full_synced_at = self._full_synced_at.get(database_id)
+            if full_synced_at is None or datetime.now(timezone.utc) - full_synced_at > self.ttl:
+                return None
+            return self._watermarks.get(database_id)
+
+    def sync(self, database_id, fetch, full_refresh=False):
+        """Refresh one database from `fetch(filter)`, an iterator of pages; returns the number of pages fetched"""
+        started = datetime.now(timezone.utc)
+        watermark = None if full_refresh else self.watermark(database_id)
+        filter = None
+        if watermark:
+            filter = {'timestamp': 'last_edited_time', 'last_edited_time': {'on_or_after': watermark}}
+
+        fetched = 0
+        changed, deleted = {}, set()
+        for page in fetch(filter):
+            fetched += 1
+            if page.get('archived') or page.get('in_trash'):
+                deleted.add(page['id'])
+            else:
+                changed[page['id']] = (_reference_date(page), page)
+
+        cutoff = started - self.retention
+        with self._lock:
+            pages = {} if watermark is None else self._pages.get(database_id, {})
+            for page_id in deleted:
+                pages.pop(page_id, None)
+            pages.update(changed)
+            self._pages[database_id] = {page_id: entry for page_id, entry in pages.items() if entry[0] >= cutoff}
+            self._watermarks[database_id] = (started - WATERMARK_SKEW).replace(microsecond=0).isoformat()
+            if watermark is None:
+                self._full_synced_at[database_id] = started
+        return fetched
+
+    def iter_pages(self, database_id, filter=None):
+        """Yield cached pages of a database that match a Notion filter"""
+        with self._lock:
+            pages = [page for _, page in self._pages.get(database_id, {}).values()]
+        for page in pages:
+            if page_matches_filter(page, filter):
+                yield page
+
+    def close(self):
+        with self._lock:
+            self._pages.clear()
+            self._watermarks.clear()
+            self._full_synced_at.clear()
@@ -0,0 +1,132 @@
+"""Durable SQLite outbox that makes email delivery idempotent and resumable.
+
+Every message is written to the outbox under an idempotency key before it is
+sent. Delivery progress is recorded per recipient batch, so a crash or SMTP
+failure leaves a pending row that a later run (or `main.py --resume`) can
+finish, and a key that has already been sent is never mailed again. Once a
+message is sent only its key and status are needed, so its body is dropped,
+and sent rows are deleted after `retention_days`.
+"""
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+from redaction import RedactedEmails
+
+log = logging.getLogger('notion_email.outbox')
+
+PENDING = 'pending'
+SENT = 'sent'
+FAILED = 'failed'
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class Outbox:
+    """Messages keyed by idempotency key, with their remaining recipients and delivery status"""
+
+    def __init__(self, path, retention_days=56):
+        self.path = path
+        self.retention = timedelta(days=retention_days)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS outbox ('
+                ' key TEXT PRIMARY KEY, status TEXT NOT NULL, from_addr TEXT NOT NULL,'
+                ' recipients TEXT NOT NULL, remaining TEXT NOT NULL, message TEXT NOT NULL,'
+                ' attempts INTEGER NOT NULL DEFAULT 0, last_error TEXT,'
+                ' created_at TEXT NOT NULL, sent_at TEXT)'
+            )
+
+    def status(self, key):
+        with self._lock:
+            row = self._db.execute('SELECT status FROM outbox WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def enqueue(self, key, from_addr, recipients, message):
+        """Store a message unless the key is already known; returns the key's status afterwards.
+
+        An existing pending or failed row is kept as is, so a rerun resumes the
+        exact message and recipients it was interrupted on.
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR IGNORE INTO outbox (key, status, from_addr, recipients, remaining, message, created_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, PENDING, from_addr, json.dumps(list(recipients)), json.dumps(list(recipients)), message, _now()),
+            )
+            return self._db.execute('SELECT status FROM outbox WHERE key = ?', (key,)).fetchone()[0]
+
+    def pending_keys(self):
+        """Keys of messages that still have recipients to deliver to, oldest first"""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT key FROM outbox WHERE status != ? ORDER BY created_at', (SENT,)
+            ).fetchall()
+        return [key for (key,) in rows]
+
+    def deliver(self, key, transport):
+        """Send a pending message batch by batch, recording progress after each batch"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT status, from_addr, remaining, message FROM outbox WHERE key = ?', (key,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        status, from_addr, remaining, message = row
+        if status == SENT:
+            return SENT
+
+        remaining = json.loads(remaining)
+        batch_size = getattr(transport, 'max_recipients', None) or max(1, len(remaining))
+        try:
+            while remaining:
+                batch = remaining[:batch_size]
+                transport.send(message, from_addr, batch, key=key)
+                remaining = remaining[len(batch):]
+                self._update(key, remaining=json.dumps(remaining))
+        except Exception as e:
+            self._update(key, status=FAILED, remaining=json.dumps(remaining), error=str(e))
+            raise
+        self._update(key, status=SENT, remaining='[]', sent_at=_now())
+        return SENT
+
+    def _update(self, key, status=None, remaining=None, error=None, sent_at=None):
+        with self._lock, self._db:
+            if remaining is not None:
+                self._db.execute('UPDATE outbox SET remaining = ? WHERE key = ?', (remaining, key))
+            if status is not None:
+                self._db.execute('UPDATE outbox SET status = ?, attempts = attempts + 1 WHERE key = ?', (status, key))
+            if error is not None:
+                self._db.execute('UPDATE outbox SET last_error = ? WHERE key = ?', (error, key))
+            if sent_at is not None:
+                # A sent message is only looked up by key again, so its body is dropped
+                self._db.execute("UPDATE outbox SET sent_at = ?, last_error = NULL, message = '' WHERE key = ?",
+                                 (sent_at, key))
+
+    def flush(self, transport):
+        """Retry every pending or failed message; returns (sent, failed) counts"""
+        sent = failed = 0
+        for key in self.pending_keys():
+            try:
+                self.deliver(key, transport)
+                sent += 1
+            except Exception as e:
+                failed += 1
+                # Personalized keys end in the recipient's address
+                log.error("Outbox delivery of %s failed: %s", RedactedEmails(key), RedactedEmails(e))
+        return sent, failed
+
+    def close(self):
+        """Delete rows sent more than `retention_days` ago, reclaim the space of dropped bodies and close"""
+        cutoff = (datetime.now(timezone.utc) - self.retention).isoformat()
+        with self._lock:
+            with self._db:
+                self._db.execute('DELETE FROM outbox WHERE status = ? AND sent_at < ?', (SENT, cutoff))
+            self._db.execute('VACUUM')
+            self._db.close()
@@ -0,0 +1,140 @@
+"""Declarative Notion queries and the plan that runs them with as few API calls as possible.
+
+Report sections are described as Query objects. plan_queries() groups the
+queries of one database, runs identical ones once and merges the rest into a
+single OR query whose results are split back per section on the client with
+page_matches_filter(). Filters are normalised to an OR of ANDs first, which
+keeps a merged filter within Notion's two levels of compound-filter nesting.
+"""
+import json
+
+from notion_cache import page_matches_filter
+
+# Larger merged filters are sent as separate queries instead
+MAX_MERGED_CLAUSES = 20
+
+
+def any_of(property, kind, values):
+    """Filter matching a status/select property equal to any of `values`"""
+    clauses = [{"property": property, kind: {"equals": value}} for value in values]
+    return clauses[0] if len(clauses) == 1 else {"or": clauses}
+
+
+def all_of(*filters):
+    return filters[0] if len(filters) == 1 else {"and": list(filters)}
+
+
+def date_between(property, after=None, before=None):
+    """Filter on a date property strictly after and/or before the given ISO timestamps"""
+    condition = {}
+    if after is not None:
+        condition["after"] = after
+    if before is not None:
+        condition["before"] = before
+    return {"property": property, "date": condition}
+
+
+def canonical(value):
+    """Stable text form of a filter/sort spec, so equal specs compare and hash equal"""
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+def conjunctions(filter):
+    """The filter as a list of AND-ed leaf lists whose OR is equivalent (disjunctive normal form)"""
+    if 'or' in filter:
+        return [conj for clause in filter['or'] for conj in conjunctions(clause)]
+    if 'and' in filter:
+        result = [[]]
+        for clause in filter['and']:
+            result = [conj + extra for conj in result for extra in conjunctions(clause)]
+        return result
+    return [[filter]]
+
+
+def merge_filters(filters):
+    """One filter matching any of `filters` (None when one of them matches everything)"""
+    if any(not f for f in filters):
+        return None
+    merged, seen = [], set()
+    for f in filters:
+        for conj in conjunctions(f):
+            key = canonical(sorted(canonical(leaf) for leaf in conj))
+            if key not in seen:
+                seen.add(key)
+                merged.append(all_of(*conj))
+    return merged[0] if len(merged) == 1 else {"or": merged}
+
+
+class Query:
+    """One section's query: database, filter, sorts, projected properties and page extractor"""
+
+    def __init__(self, database_id, filter=None, sorts=None, properties=None, extract=None, dump_label=None):
+        self.database_id = database_id
+        self.filter = filter
+        self.sorts = sorts
+        self.properties = properties
+        self.extract = extract
+        self.dump_label = dump_label
+        self.key = canonical([database_id, filter, sorts, sorted(properties or [])])
+
+
+class QueryGroup:
+    """Queries answered by one Notion query; `members` maps section name to its Query"""
+
+    def __init__(self, database_id, members):
+        self.database_id = database_id
+        self.members = members
+        queries = list(members.values())
+        self.merged = len({query.key for query in queries}) > 1
+        self.filter = merge_filters([query.filter for query in queries]) if self.merged else queries[0].filter
+        self.sorts = None if self.merged else queries[0].sorts
+        properties = set()
+        for query in queries:
+            properties.update(query.properties or ())
+        self.properties = sorted(properties) if all(query.properties for query in queries) else None
+        self.key = canonical([database_id, self.filter, self.sorts, self.properties])
+        # Pages Notion returned for the merged filter that no member's filter matched locally
+        self.unrouted = 0
+
+    def route(self, pages):
+        """Yield (member name, page) for every member whose filter a page matches, as the pages stream in
+
+        A page no member matches is counted in `unrouted`: Notion and
+        page_matches_filter() disagree about it, and it reaches no section.
+        """
+        for page in pages:
+            routed = False
+            for name, query in self.members.items():
+                if not self.merged or page_matches_filter(page, query.filter):
+                    routed = True
+                    yield name, page
+            if not routed:
+                self.unrouted += 1
+
+
+def plan_queries(queries, merge=True):
+    """Group section queries into as few Notion queries as possible; returns {section: QueryGroup}"""
+    by_database = {}
+    for name, query in queries.items():
+        by_database.setdefault(query.database_id, {})[name] = query
+    plan = {}
+    for database_id, members in by_database.items():
+        groups = [members]
+        if not merge or _merged_size(members.values()) > MAX_MERGED_CLAUSES:
+            # Still run identical queries once
+            groups = {}
+            for name, query in members.items():
+                groups.setdefault(query.key, {})[name] = query
+            groups = list(groups.values())
+        for group_members in groups:
+            group = QueryGroup(database_id, group_members)
+            for name in group_members:
+                plan[name] = group
+    return plan
+
+
+def _merged_size(queries):
+    filters = [query.filter for query in queries]
+    if any(not f for f in filters):
+        return 0
+    return sum(len(conj) for f in filters for conj in conjunctions(f))
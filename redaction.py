@@ -0,0 +1,30 @@
+"""Masking of email addresses in log output.
+
+Recipient addresses reach the logs through To/CC lists, personalized delivery
+keys and SMTP error texts; every module logs them through RedactedEmails.
+"""
+import re
+
+# Quotes, brackets and ':' end the local part, as they surround addresses in error
+# texts and delivery keys
+EMAIL_ADDRESS = re.compile(r'([^\s@,<>;:\'"(){}\[\]]+)@([^\s@,<>;\'"(){}\[\]]+)')
+
+
+def redact_email(text):
+    """Mask the local part of every address in `text`: jane.doe@example.com -> j***@example.com"""
+    return EMAIL_ADDRESS.sub(lambda m: f"{m.group(1)[0]}***@{m.group(2)}", text)
+
+
+class RedactedEmails:
+    """Log argument that redacts addresses only if the record is actually formatted
+
+    Takes an address, a list of addresses or anything else with addresses in
+    its text, such as an SMTP exception.
+    """
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        value = ', '.join(self.value) if isinstance(self.value, (list, tuple, set)) else str(self.value)
+        return redact_email(value)
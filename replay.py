@@ -0,0 +1,114 @@
+"""Recorded Notion responses, for previewing and diffing runs without network access.
+
+`main.py --record FILE` saves every Notion response of a run, plus the run
+clock, to a gzip JSON file. `main.py --replay FILE` answers the same requests
+from it through ReplayNotion and, with the clock pinned to the recorded one,
+renders byte-identical output that compare_directories() can check against a
+golden copy.
+"""
+import difflib
+import gzip
+import json
+import os
+import threading
+
+from dates import parse_datetime
+from query_plan import canonical
+
+FORMAT_VERSION = 1
+
+
+class Recording:
+    """Notion responses of one run keyed by method and request, plus the run clock"""
+
+    def __init__(self, now=None, responses=None):
+        self.now = now
+        self.responses = responses or {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(method, request):
+        return canonical([method, request])
+
+    def add(self, method, request, response):
+        with self._lock:
+            self.responses.setdefault(self._key(method, request), (method, request, response))
+
+    def lookup(self, method, request):
+        entry = self.responses.get(self._key(method, request))
+        if entry is None:
+            raise LookupError(f"{method} on {request.get('database_id')} with these parameters is not in the "
+                              f"recording; record again with the current settings")
+        return entry[2]
+
+    def save(self, path):
+        with self._lock:
+            data = {
+                'version': FORMAT_VERSION,
+                'now': self.now.isoformat() if self.now else None,
+                'responses': list(self.responses.values()),
+            }
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} recording")
+        recording = cls(parse_datetime(data['now']) if data.get('now') else None)
+        for method, request, response in data['responses']:
+            recording.add(method, request, response)
+        return recording
+
+
+class ReplayNotion:
+    """Stand-in for the Notion client that answers from a Recording"""
+
+    def __init__(self, recording):
+        self.databases = _ReplayEndpoint(recording, 'databases')
+
+
+class _ReplayEndpoint:
+
+    def __init__(self, recording, name):
+        self._recording = recording
+        self._name = name
+
+    def __getattr__(self, name):
+        method = f"{self._name}.{name}"
+        def call(**kwargs):
+            return self._recording.lookup(method, kwargs)
+        return call
+
+
+def compare_directories(output, golden, context=3, max_lines=40):
+    """Unified diffs of the files that differ between `output` and `golden`; empty when they match"""
+    missing = [f"{directory}: no such directory" for directory in (output, golden) if not os.path.isdir(directory)]
+    if missing:
+        return missing
+    names = sorted(set(os.listdir(output)) | set(os.listdir(golden)))
+    diffs = []
+    for name in names:
+        ours, theirs = os.path.join(output, name), os.path.join(golden, name)
+        if not os.path.exists(theirs):
+            diffs.append(f"{name}: not in {golden}")
+            continue
+        if not os.path.exists(ours):
+            diffs.append(f"{name}: missing from {output}")
+            continue
+        with open(ours, 'rb') as f:
+            new = f.read()
+        with open(theirs, 'rb') as f:
+            old = f.read()
+        if new == old:
+            continue
+        lines = list(difflib.unified_diff(
+            old.decode('utf-8', 'replace').splitlines(), new.decode('utf-8', 'replace').splitlines(),
+            theirs, ours, n=context, lineterm='',
+        ))
+        if len(lines) > max_lines:
+            lines = lines[:max_lines] + [f"... {len(lines) - max_lines} more diff lines"]
+        diffs.append('\n'.join(lines))
+    return diffs
@@ -0,0 +1,72 @@
+"""Report definitions: which Notion databases a digest reads, how it filters them and who gets it.
+
+Without a config file main.py runs one report built from DEV_RELEASES_DB and
+DEVELOPMENT_TASKS_DB. Point REPORTS_PATH at a JSON file to run several, e.g.:
+
+    {"reports": [
+        {"name": "platform", "releases_db": "...", "tasks_db": "...",
+         "to": ["platform@example.com"], "title": "Platform Weekly Update"},
+        {"name": "mobile", "releases_db": "...", "tasks_db": "...",
+         "bug_types": ["Bug", "Crash"], "lookback_days": 14,
+         "headings": {"bug_fixes": "Mobile fixes"}}
+    ]}
+
+Any field of Report can be set; lists become tuples.
+"""
+import json
+from dataclasses import dataclass, field, fields
+from typing import Dict, Optional, Tuple
+
+DEFAULT_REPORT_NAME = 'default'
+
+
+@dataclass
+class Report:
+    """One digest: its source databases, filters, recipients and template overrides"""
+    name: str
+    releases_db: str
+    tasks_db: str
+    # Explicit recipients; when empty they come from the releases' Email To/CC columns
+    to: Tuple[str, ...] = ()
+    cc: Tuple[str, ...] = ()
+    # 'shared' or 'personalized'; None uses the run's mode (EMAIL_MODE)
+    mode: Optional[str] = None
+    title: str = 'Weekly Development Update'
+    subject: str = 'Weekly Development Release Notes - {date}'
+    # Section key -> heading text, e.g. {"bug_fixes": "Fixes"}
+    headings: Dict[str, str] = field(default_factory=dict)
+    # HTML signature; None falls back to the signature file / EMAIL_SIGNATURE
+    signature: Optional[str] = None
+    recent_statuses: Tuple[str, ...] = ('Completed',)
+    upcoming_statuses: Tuple[str, ...] = ('Upcoming', 'In Progress')
+    bug_types: Tuple[str, ...] = ('Bug',)
+    done_statuses: Tuple[str, ...] = ('Done',)
+    lookback_days: int = 7
+    lookahead_days: int = 14
+
+
+def load_reports(path):
+    """Parse the report definitions of a JSON config file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    entries = data.get('reports', []) if isinstance(data, dict) else data
+    known = {f.name for f in fields(Report)}
+    reports = []
+    for entry in entries:
+        name = entry.get('name')
+        unknown = set(entry) - known
+        if unknown:
+            raise ValueError(f"Unknown settings {sorted(unknown)} in report {name!r}")
+        missing = {'name', 'releases_db', 'tasks_db'} - set(entry)
+        if missing:
+            raise ValueError(f"Report {name!r} is missing {sorted(missing)}")
+        if entry.get('mode') not in (None, 'shared', 'personalized'):
+            raise ValueError(f"Unknown mode {entry['mode']!r} for report {name!r}")
+        reports.append(Report(**{key: tuple(value) if isinstance(value, list) else value
+                                 for key, value in entry.items()}))
+    names = [report.name for report in reports]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Report names must be unique: {names}")
+    if not reports:
+        raise ValueError(f"{path} does not define any report")
+    return reports
@@ -0,0 +1,109 @@
+"""Per-run instrumentation: stage timers, counters and the end-of-run report.
+
+main.py records into one RunMetrics per run and, when the run ends, writes it
+as JSON (METRICS_PATH) and as a Markdown table to the GitHub Actions step
+summary. Set PROFILE_PATH to also dump a cProfile of the whole run.
+"""
+import contextlib
+import json
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where it cannot be read"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class RunMetrics:
+    """Thread-safe stage timings and counters of one run"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Add the wall time of the block to stage `name`"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name, value):
+        with self._lock:
+            self.counters[name] = value
+
+    def to_dict(self, status='ok'):
+        with self._lock:
+            return {
+                'started_at': self.started_at.isoformat(),
+                'status': status,
+                'duration_seconds': round(time.perf_counter() - self._started, 3),
+                'stages': {name: round(seconds, 4) for name, seconds in self.stages.items()},
+                'counters': dict(self.counters),
+                'peak_rss_bytes': peak_rss_bytes(),
+            }
+
+    def write_json(self, path, status='ok'):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(status), f, indent=2)
+
+    def write_step_summary(self, path, status='ok'):
+        """Append a Markdown report to a GitHub Actions step summary file"""
+        report = self.to_dict(status)
+        lines = [
+            f"### Weekly email run: {report['status']} in {report['duration_seconds']:.1f}s",
+            '',
+            '| Stage | Seconds |',
+            '| --- | ---: |',
+        ]
+        lines += [f'| {name} | {seconds:.3f} |' for name, seconds in report['stages'].items()]
+        lines += ['', '| Counter | Value |', '| --- | ---: |']
+        lines += [f'| {name} | {value} |' for name, value in sorted(report['counters'].items())]
+        if report['peak_rss_bytes']:
+            lines.append(f"| peak RSS (MiB) | {report['peak_rss_bytes'] / 2 ** 20:.1f} |")
+        with open(path, 'a') as f:
+            f.write('\n'.join(lines) + '\n')
+
+
+@contextlib.contextmanager
+def profiled(path):
+    """Profile the block with cProfile and dump the stats to `path` (no-op when path is empty)"""
+    if not path:
+        yield
+        return
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
@@ -0,0 +1,143 @@
+"""Crontab-style scheduling for running digests from a long-lived process.
+
+CronSchedule understands the classic five fields (minute hour day-of-month
+month day-of-week) with `*`, lists, ranges, steps and month/day names, plus the
+@hourly/@daily/@weekly/@monthly shortcuts. Times are evaluated in UTC, like
+GitHub Actions cron.
+"""
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+
+log = logging.getLogger('notion_email.scheduler')
+
+ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+
+MONTH_NAMES = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+DAY_NAMES = ['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat']
+
+# (lowest, highest, names) per field; names map to lowest + index
+FIELDS = [
+    (0, 59, None),
+    (0, 23, None),
+    (1, 31, None),
+    (1, 12, MONTH_NAMES),
+    (0, 7, DAY_NAMES),
+]
+
+# Give up looking for a match after this many days (e.g. "0 0 31 2 *" never fires)
+SEARCH_DAYS = 366 * 5
+
+
+def _value(text, low, names):
+    text = text.lower()
+    if names and text in names:
+        return low + names.index(text)
+    return int(text)
+
+
+def _parse_field(text, low, high, names):
+    """Set of values a single cron field allows"""
+    values = set()
+    for part in text.split(','):
+        range_part, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if range_part == '*':
+            start, end = low, high
+        elif '-' in range_part:
+            start, end = (_value(bound, low, names) for bound in range_part.split('-', 1))
+        else:
+            start = _value(range_part, low, names)
+            end = high if step > 1 else start
+        if not low <= start <= end <= high or step < 1:
+            raise ValueError(f"Invalid cron field {text!r}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """A parsed crontab expression that can compute its next firing time"""
+
+    def __init__(self, expression):
+        self.expression = expression.strip()
+        fields = ALIASES.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        minutes, hours, days, months, weekdays = (
+            _parse_field(text, *spec) for text, spec in zip(fields, FIELDS)
+        )
+        self.minutes = sorted(minutes)
+        self.hours = sorted(hours)
+        self.days = days
+        self.months = months
+        self.weekdays = {day % 7 for day in weekdays}  # 7 is also Sunday
+        # As in cron, a restricted day-of-month and day-of-week match if either does
+        self._any_day = fields[2] == '*' or fields[4] == '*'
+
+    def _day_matches(self, when):
+        day_ok = when.day in self.days
+        weekday_ok = (when.weekday() + 1) % 7 in self.weekdays
+        return day_ok and weekday_ok if self._any_day else day_ok or weekday_ok
+
+    def next_after(self, when):
+        """First matching minute strictly after `when` (keeps its tzinfo)"""
+        candidate = (when + timedelta(minutes=1)).replace(second=0, microsecond=0)
+        for _ in range(SEARCH_DAYS):
+            if candidate.month in self.months and self._day_matches(candidate):
+                for hour in self.hours:
+                    if hour < candidate.hour:
+                        continue
+                    for minute in self.minutes:
+                        if hour == candidate.hour and minute < candidate.minute:
+                            continue
+                        return candidate.replace(hour=hour, minute=minute)
+            candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+        raise ValueError(f"Cron expression {self.expression!r} never fires")
+
+    def __repr__(self):
+        return f"CronSchedule({self.expression!r})"
+
+
+class Scheduler:
+    """Runs each job's action at its schedule's firing times until stopped
+
+    `jobs` is a list of (name, CronSchedule, action) where action(fire_time)
+    does the work. A failing job is logged and tried again at its next time.
+    """
+
+    # Wake up at least this often so clock changes and stop requests are noticed
+    MAX_SLEEP_SECONDS = 60
+
+    def __init__(self, jobs, clock=None):
+        self.jobs = jobs
+        self.clock = clock or (lambda: datetime.now(timezone.utc))
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_forever(self):
+        now = self.clock()
+        upcoming = {name: schedule.next_after(now) for name, schedule, _ in self.jobs}
+        for name, schedule, _ in self.jobs:
+            log.info("Scheduled %s (%s), next run at %s", name, schedule.expression, upcoming[name].isoformat())
+        while not self._stop.is_set():
+            now = self.clock()
+            for name, schedule, action in self.jobs:
+                fire_time = upcoming[name]
+                if fire_time > now:
+                    continue
+                log.info("Running %s scheduled for %s", name, fire_time.isoformat())
+                try:
+                    action(fire_time)
+                except Exception as e:
+                    log.error("Scheduled run of %s failed: %s", name, e)
+                upcoming[name] = schedule.next_after(max(fire_time, self.clock()))
+                log.info("Next run of %s at %s", name, upcoming[name].isoformat())
+            delay = (min(upcoming.values()) - self.clock()).total_seconds()
+            self._stop.wait(min(max(delay, 0), self.MAX_SLEEP_SECONDS))
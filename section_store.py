@@ -0,0 +1,96 @@
+"""Content hashes of report sections, their rendered fragments and what each report last sent.
+
+A section's content hash covers the fields of its items that reach the email,
+so an unchanged section is recognised across runs. SectionStore keeps the
+rendered HTML/text of sections by a key derived from that hash (plus
+everything else that shapes the markup), and the hashes of the last digest
+each report sent (per daemon digest), which lets main.py skip or shorten a digest when nothing
+changed.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+# Item attributes that reach the email; missing ones hash as ''
+HASHED_FIELDS = ('id', 'title', 'description', 'date', 'status', 'priority')
+
+
+def content_hash(items, omitted=0):
+    """Stable hash of the email-visible fields of `items`, in order, and of how many items were left out"""
+    digest = hashlib.sha1()
+    for item in items:
+        digest.update('\x1f'.join(str(getattr(item, name, '') or '') for name in HASHED_FIELDS).encode())
+        digest.update(b'\x1e')
+    if omitted:
+        digest.update(f"+{omitted}".encode())
+    return digest.hexdigest()
+
+
+class SectionStore:
+    """SQLite store of rendered fragments by key and of each report's last sent section hashes"""
+
+    def __init__(self, path, retention_days=30, max_fragment_bytes=1 << 20):
+        self.path = path
+        self.retention = timedelta(days=retention_days)
+        self.max_fragment_bytes = max_fragment_bytes
+        self._lock = threading.Lock()
+        self._memory = {}
+        self._used = set()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS fragments ('
+                ' key TEXT PRIMARY KEY, html TEXT NOT NULL, text TEXT NOT NULL, used_at TEXT NOT NULL)'
+            )
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS sent ('
+                ' report TEXT PRIMARY KEY, hashes TEXT NOT NULL, sent_at TEXT NOT NULL)'
+            )
+
+    def fragment(self, key):
+        """(html, text) rendered earlier under `key`, or None"""
+        with self._lock:
+            if key not in self._memory:
+                row = self._db.execute('SELECT html, text FROM fragments WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    return None
+                self._memory[key] = row
+            self._used.add(key)
+            return self._memory[key]
+
+    def put_fragment(self, key, html, text):
+        with self._lock:
+            self._memory[key] = (html, text)
+            self._used.add(key)
+            if len(html) + len(text) > self.max_fragment_bytes:
+                return
+            with self._db:
+                self._db.execute('INSERT OR REPLACE INTO fragments (key, html, text, used_at) VALUES (?, ?, ?, ?)',
+                                 (key, html, text, _now()))
+
+    def last_sent(self, name):
+        """{section: content hash} of the last digest sent under `name` (a report, or report/digest), or None"""
+        with self._lock:
+            row = self._db.execute('SELECT hashes FROM sent WHERE report = ?', (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def record_sent(self, name, hashes):
+        with self._lock, self._db:
+            self._db.execute('INSERT OR REPLACE INTO sent (report, hashes, sent_at) VALUES (?, ?, ?)',
+                             (name, json.dumps(hashes, sort_keys=True), _now()))
+
+    def close(self):
+        """Mark this run's fragments as used, drop those unused for `retention_days` and close"""
+        with self._lock, self._db:
+            now = _now()
+            self._db.executemany('UPDATE fragments SET used_at = ? WHERE key = ?',
+                                 [(now, key) for key in self._used])
+            cutoff = (datetime.now(timezone.utc) - self.retention).isoformat()
+            self._db.execute('DELETE FROM fragments WHERE used_at < ?', (cutoff,))
+        self._db.close()
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
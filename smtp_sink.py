@@ -0,0 +1,100 @@
+"""Local SMTP sink for testing email delivery offline (requires aiosmtpd).
+
+Accepts every message and keeps it in memory. Point main.py at it with:
+
+    python smtp_sink.py --port 8025
+    SMTP_HOST=127.0.0.1 SMTP_PORT=8025 SMTP_STARTTLS=0 python main.py
+
+Set --fail-first N to answer the first N messages with a transient 451 error,
+which exercises the transport's retry path. --max-size caps the accepted
+message size in bytes (0 accepts any size).
+"""
+import argparse
+import threading
+import time
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:  # pragma: no cover - optional development dependency
+    Controller = None
+
+
+# aiosmtpd's own default (32 MiB)
+DEFAULT_MAX_SIZE = 33554432
+
+
+class _Handler:
+    def __init__(self, sink):
+        self.sink = sink
+
+    async def handle_DATA(self, server, session, envelope):
+        with self.sink._lock:
+            if self.sink.fail_first > 0:
+                self.sink.fail_first -= 1
+                return '451 4.3.0 Temporary failure, try again later'
+            self.sink.messages.append({
+                'from': envelope.mail_from,
+                'recipients': list(envelope.rcpt_tos),
+                'data': envelope.original_content or envelope.content,
+            })
+        return '250 Message accepted for delivery'
+
+
+class SMTPSink:
+    """In-memory SMTP server that records every accepted message"""
+
+    def __init__(self, host='127.0.0.1', port=8025, fail_first=0, max_size=DEFAULT_MAX_SIZE):
+        if Controller is None:
+            raise RuntimeError("smtp_sink needs aiosmtpd: pip install -r requirements-dev.txt")
+        self.messages = []
+        self.fail_first = fail_first
+        self._lock = threading.Lock()
+        self._controller = Controller(_Handler(self), hostname=host, port=port, data_size_limit=max_size or None)
+
+    @property
+    def host(self):
+        return self._controller.hostname
+
+    @property
+    def port(self):
+        return self._controller.port
+
+    def start(self):
+        self._controller.start()
+        return self
+
+    def stop(self):
+        self._controller.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local SMTP sink that accepts and counts messages')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--fail-first', type=int, default=0, help='answer the first N messages with 451')
+    parser.add_argument('--max-size', type=int, default=DEFAULT_MAX_SIZE, help='largest accepted message in bytes')
+    args = parser.parse_args()
+
+    with SMTPSink(args.host, args.port, args.fail_first, args.max_size) as sink:
+        print(f"SMTP sink listening on {args.host}:{args.port}")
+        seen = 0
+        try:
+            while True:
+                time.sleep(1)
+                if len(sink.messages) != seen:
+                    for message in sink.messages[seen:]:
+                        print(f"Accepted message from {message['from']} for {len(message['recipients'])} recipients "
+                              f"({len(message['data'])} bytes)")
+                    seen = len(sink.messages)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
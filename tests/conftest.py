@@ -0,0 +1,48 @@
+"""Shared fixtures: the fake Notion server, a local SMTP sink and main.py configured against them."""
+import os
+import socket
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fake_notion  # noqa: E402
+import main as main_module  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def notion_server():
+    with fake_notion.FakeNotionServer(fake_notion.default_databases(120, 120)) as server:
+        yield server
+
+
+@pytest.fixture
+def smtp_sink():
+    from smtp_sink import SMTPSink
+    with SMTPSink(port=free_port()) as sink:
+        yield sink
+
+
+@pytest.fixture
+def configured_main(monkeypatch, tmp_path, notion_server):
+    """main.py pointed at the fake Notion server, with nothing written outside `tmp_path`"""
+    settings = dict(
+        NOTION_TOKEN='test', NOTION_BASE_URL=notion_server.url, NOTION_RATE_LIMIT=0, NOTION_CACHE_PATH=None,
+        DEV_RELEASES_DB=fake_notion.RELEASES_DB_ID, DEVELOPMENT_TASKS_DB=fake_notion.TASKS_DB_ID,
+        EMAIL_USER='digest@example.com', EMAIL_PASS=None, REPORTS_PATH=None, RECIPIENT_INDEX_PATH=None,
+        OUTBOX_PATH='', ARCHIVE_PATH='', SECTION_STORE_PATH='', METRICS_PATH='', PROFILE_PATH=None,
+        EMAIL_TRANSPORT='file', EMAIL_FILE_DIR=str(tmp_path / 'preview'), notion=None,
+    )
+    monkeypatch.delenv('GITHUB_STEP_SUMMARY', raising=False)
+    main_module.close_transport()
+    for name, value in settings.items():
+        monkeypatch.setattr(main_module, name, value)
+    yield main_module
+    main_module.close_transport()
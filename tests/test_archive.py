@@ -0,0 +1,51 @@
+import gzip
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from archive import WeeklyArchive, compute_trends, format_trends
+
+WEEK_1 = datetime(2026, 10, 9, 23, 0, tzinfo=timezone.utc)
+WEEK_2 = WEEK_1 + timedelta(days=7)
+
+
+def item(item_id, date, priority=''):
+    return SimpleNamespace(id=item_id, title=f'Item {item_id}', date=date, status='', priority=priority)
+
+
+def test_trends_count_launches_fixes_priorities_and_slips(tmp_path):
+    archive = WeeklyArchive(str(tmp_path))
+    archive.append('web', WEEK_1, {
+        'recent_launches': [item('r1', '2026-10-08')],
+        'upcoming_launches': [item('u1', '2026-10-14'), item('u2', '2026-10-15')],
+        'bug_fixes': [item('b1', '2026-10-08', 'High'), item('b2', '2026-10-09', 'High'), item('b3', '', '')],
+    }, {'recent_launches': 4})
+    # u1 ships on time, u2 moves a week later
+    archive.append('web', WEEK_2, {
+        'recent_launches': [item('u1', '2026-10-14')],
+        'upcoming_launches': [item('u2', '2026-10-22')],
+        'bug_fixes': [],
+    })
+    trends = compute_trends(archive.read('web'))
+    assert [row['week'] for row in trends] == ['2026-W41', '2026-W42']
+    assert [row['launches'] for row in trends] == [5, 1]
+    assert trends[0]['priority_mix'] == {'High': 2, 'None': 1}
+    assert (trends[0]['planned'], trends[0]['slipped'], trends[0]['slip_rate']) == (2, 1, 0.5)
+    assert trends[1]['slip_rate'] is None
+    text = format_trends('web', trends)
+    assert '| 2026-W41 | 5 | 3 | High 2, None 1 | 2 | 1 | 50% |' in text
+    assert 'Average per week over 2 weeks: 3.0 launches, 1.5 bug fixes.' in text
+
+
+def test_latest_complete_run_of_a_week_wins(tmp_path):
+    archive = WeeklyArchive(str(tmp_path))
+    sections = {'recent_launches': [item('r1', '2026-10-08')], 'bug_fixes': []}
+    archive.append('web', WEEK_1, sections)
+    path = archive.append('web', WEEK_1 + timedelta(hours=1), dict(sections, recent_launches=[]))
+    assert archive.read_week('web', '2026-W41')['recent_launches']['id'] == []
+
+    # A run cut short after its first line is ignored
+    with gzip.open(path, 'at', encoding='utf-8') as f:
+        f.write('{"run_at": "2026-10-10T01:00:00+00:00", "week": "2026-W41", "section": "bug_fixes",'
+                ' "sections": 2, "omitted": 0, "columns": {"id": [], "title": [], "date": [], "status": [],'
+                ' "priority": []}}\n')
+    assert archive.read_week('web', '2026-W41')['recent_launches']['id'] == []
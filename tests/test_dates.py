@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta, timezone
+
+import main
+from dates import format_datetime, get_zone, is_date_only, parse_datetime
+
+
+def test_same_instant_in_other_offsets_is_not_served_from_the_cache():
+    utc = datetime(2026, 10, 16, 12, 0, tzinfo=timezone.utc)
+    pacific = utc.astimezone(timezone(timedelta(hours=-7)))
+    assert utc == pacific and hash(utc) == hash(pacific)
+    assert format_datetime(utc, '%H:%M') == '12:00'
+    assert format_datetime(pacific, '%H:%M') == '05:00'
+
+
+def test_format_datetime_converts_to_the_zone():
+    when = parse_datetime('2026-10-16T03:30:00Z')
+    assert format_datetime(when, '%Y-%m-%d %H:%M', get_zone('America/Los_Angeles')) == '2026-10-15 20:30'
+
+
+def test_naive_values_are_taken_as_utc():
+    assert parse_datetime('2026-10-16T03:30:00').tzinfo == timezone.utc
+    assert parse_datetime('2026-10-16') == datetime(2026, 10, 16, tzinfo=timezone.utc)
+
+
+def test_is_date_only():
+    assert is_date_only('2026-10-16')
+    assert not is_date_only('2026-10-16T00:00:00Z')
+    assert not is_date_only('')
+
+
+def test_date_only_values_keep_their_day_in_the_report_timezone(monkeypatch):
+    monkeypatch.setattr(main, 'REPORT_TIMEZONE', 'America/Los_Angeles')
+    day = '2026-10-16'
+    assert main.format_item_date(main.parse_item_date(day), '%b %d', day) == 'Oct 16'
+    instant = '2026-10-16T03:30:00Z'
+    assert main.format_item_date(main.parse_item_date(instant), '%b %d', instant) == 'Oct 15'
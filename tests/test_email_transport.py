@@ -0,0 +1,79 @@
+import smtplib
+import threading
+import time
+
+from email_transport import SMTPTransport, batched
+
+MESSAGE = b'Subject: test\r\n\r\nhello\r\n'
+
+
+class DroppingServer:
+    """An SMTP connection that is dropped by the server during every send"""
+
+    def sendmail(self, from_addr, recipients, message):
+        time.sleep(0.05)
+        raise smtplib.SMTPServerDisconnected('connection dropped')
+
+    def close(self):
+        pass
+
+
+class DroppingTransport(SMTPTransport):
+    def _connect(self):
+        with self._lock:
+            self.connections_opened += 1
+        return DroppingServer()
+
+
+def send_from_threads(transport, count, recipients=('b@example.com',)):
+    errors = []
+
+    def send():
+        try:
+            transport.send(MESSAGE, 'a@example.com', list(recipients))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=send, daemon=True) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return [thread for thread in threads if thread.is_alive()], errors
+
+
+def test_batched():
+    assert batched(['a', 'b', 'c', 'd', 'e'], 2) == [['a', 'b'], ['c', 'd'], ['e']]
+    assert batched(['a'], 0) == [['a']]
+
+
+def test_threads_waiting_for_a_connection_wake_when_one_is_discarded():
+    transport = DroppingTransport('127.0.0.1', 25, starttls=False, pool_size=1, max_retries=0)
+    alive, errors = send_from_threads(transport, 3)
+    assert alive == []
+    assert len(errors) == 3 and all(isinstance(e, smtplib.SMTPServerDisconnected) for e in errors)
+    assert transport._open == 0
+
+
+def test_pooled_connections_are_reused(smtp_sink):
+    transport = SMTPTransport(smtp_sink.host, smtp_sink.port, starttls=False, pool_size=2)
+    alive, errors = send_from_threads(transport, 10)
+    assert alive == [] and errors == []
+    assert len(smtp_sink.messages) == 10
+    assert transport.connections_opened <= 2
+    transport.close()
+    assert transport._open == 0
+
+
+def test_large_recipient_lists_are_sent_in_batches(smtp_sink):
+    with SMTPTransport(smtp_sink.host, smtp_sink.port, starttls=False, max_recipients=2) as transport:
+        transport.send(MESSAGE, 'a@example.com', [f'user{i}@example.com' for i in range(5)])
+    assert [len(message['recipients']) for message in smtp_sink.messages] == [2, 2, 1]
+
+
+def test_transient_failures_are_retried(smtp_sink):
+    smtp_sink.fail_first = 1
+    with SMTPTransport(smtp_sink.host, smtp_sink.port, starttls=False, backoff_base=0.01) as transport:
+        transport.send(MESSAGE, 'a@example.com', ['b@example.com'])
+    assert transport.retries == 1
+    assert len(smtp_sink.messages) == 1
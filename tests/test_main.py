@@ -0,0 +1,260 @@
+import email
+import logging
+import os
+import re
+from email import policy
+
+import pytest
+
+import fake_notion
+import main
+from reports import Report
+
+
+def release(item_id, to='', cc='', title=None):
+    return main.ReleaseItem(id=item_id, title=title or f'Release {item_id}', description='', date='2026-10-12',
+                            when=None, status='Completed', email_to=to, email_cc=cc)
+
+
+def test_recipient_index_roles():
+    index = main.RecipientIndex()
+    index.update([release('r1', to='Ann@Example.com, bob@example.com', cc='lead@example.com'),
+                  release('r2', to='lead@example.com; not-an-address')])
+    assert index.to_recipients == ['ann@example.com', 'bob@example.com', 'lead@example.com']
+    assert index.cc_recipients == []
+    assert index.items_for('ANN@example.com') == {'r1'}
+    assert index.items_for('lead@example.com') == {'r1', 'r2'}
+
+
+def test_recipient_index_updates_replace_what_an_item_contributed():
+    index = main.RecipientIndex()
+    index.update([release('r1', to='ann@example.com', cc='lead@example.com'),
+                  release('r2', to='bob@example.com')])
+    index.update([release('r1', cc='ann@example.com')])
+    assert index.to_recipients == ['bob@example.com']
+    assert index.cc_recipients == ['ann@example.com']
+    index.retain(['r1'])
+    assert index.to_recipients == []
+    assert index.items_for('bob@example.com') == set()
+    assert main.RecipientIndex.from_dict(index.to_dict()).to_dict() == index.to_dict()
+
+
+def test_recipient_index_merge():
+    index, cut = main.RecipientIndex(), main.RecipientIndex()
+    index.update([release('r1', to='ann@example.com')])
+    cut.update([release('r1', cc='ann@example.com'), release('r2', to='bob@example.com')])
+    index.merge(cut)
+    assert index.to_recipients == ['bob@example.com']
+    assert index.cc_recipients == ['ann@example.com']
+    assert sorted(index.item_ids()) == ['r1', 'r2']
+
+
+def test_compose_message_stays_under_the_size_cap():
+    report = Report(name='default', releases_db='releases', tasks_db='tasks')
+    items = [release(f'r{i}', title=f'Release {i} ' + 'x' * 200) for i in range(300)]
+    sections = [('recent_launches', items, 0), ('upcoming_launches', items[:50], 0), ('bug_fixes', [], 0)]
+    full = main.compose_message(sections, ['ann@example.com'], report=report, max_bytes=0)
+    assert len(full) > 60000
+
+    data = main.compose_message(sections, ['ann@example.com'], report=report, max_bytes=60000)
+    assert 50000 < len(data) <= 60000
+    text = email.message_from_bytes(data, policy=policy.default).get_body(('plain',)).get_content()
+    assert 'Release 0 ' in text
+    assert 'more' in text
+
+
+def test_small_message_is_not_cut():
+    report = Report(name='default', releases_db='releases', tasks_db='tasks')
+    sections = [('recent_launches', [release('r1')], 0)]
+    assert main.compose_message(sections, ['ann@example.com'], report=report, max_bytes=60000) == \
+        main.compose_message(sections, ['ann@example.com'], report=report, max_bytes=0)
+
+
+@pytest.mark.parametrize('mode', ['shared', 'personalized'])
+def test_digest_is_delivered_over_smtp(configured_main, smtp_sink, monkeypatch, mode):
+    monkeypatch.setattr(configured_main, 'EMAIL_TRANSPORT', 'smtp')
+    monkeypatch.setattr(configured_main, 'SMTP_HOST', smtp_sink.host)
+    monkeypatch.setattr(configured_main, 'SMTP_PORT', smtp_sink.port)
+    monkeypatch.setattr(configured_main, 'SMTP_STARTTLS', False)
+    configured_main.main(mode=mode)
+
+    # The fake releases list team0..24@ as To and lead0..4@ as CC
+    recipients = [address for message in smtp_sink.messages for address in message['recipients']]
+    assert recipients and len(set(recipients)) == len(recipients)
+    assert all(address.startswith(('team', 'lead')) for address in recipients)
+    if mode == 'shared':
+        assert len(smtp_sink.messages) == 1
+    else:
+        assert all(len(message['recipients']) == 1 for message in smtp_sink.messages)
+    message = email.message_from_bytes(smtp_sink.messages[0]['data'], policy=policy.default)
+    assert message['From'] == 'digest@example.com'
+    assert 'Release' in message.get_body(('plain',)).get_content()
+
+
+def test_debug_log_does_not_show_recipient_addresses(configured_main, caplog):
+    caplog.set_level(logging.DEBUG, logger='notion_email')
+    configured_main.main(mode='shared')
+    assert 'First result' in caplog.text
+    assert not re.search(r'(team|lead)\d+@example\.com', caplog.text)
+
+
+def test_digests_pick_their_mode_reports_and_window():
+    weekly, daily = main.parse_digests('weekly=0 23 * * 5; daily=@daily personalized reports=web,mobile days=1')
+    assert (weekly.name, weekly.mode, weekly.reports, weekly.lookback_days) == ('weekly', main.EMAIL_MODE, (), None)
+    assert (daily.name, daily.mode, daily.reports, daily.lookback_days) == ('daily', 'personalized',
+                                                                           ('web', 'mobile'), 1)
+    for text in ('x=@daily weekly', 'x=@daily days=0', 'x=@daily colour=red'):
+        with pytest.raises(ValueError):
+            main.parse_digests(text)
+
+
+def test_select_reports():
+    reports = [Report(name=name, releases_db='releases', tasks_db='tasks') for name in ('web', 'mobile', 'api')]
+    assert main.select_reports(reports) == reports
+    selected = main.select_reports(reports, ('api', 'web'), lookback_days=1)
+    assert [(report.name, report.lookback_days) for report in selected] == [('api', 1), ('web', 1)]
+    assert reports[0].lookback_days == 7
+    with pytest.raises(ValueError):
+        main.select_reports(reports, ('web', 'desktop'))
+
+
+def test_digest_window_replaces_the_report_lookback(configured_main, monkeypatch, tmp_path):
+    monkeypatch.setattr(configured_main, 'ARCHIVE_PATH', str(tmp_path / 'archive'))
+    configured_main.main(lookback_days=1)
+    daily = configured_main.metrics.counters['items_recent_launches']
+    assert not (tmp_path / 'archive').exists()
+    configured_main.main()
+    assert configured_main.metrics.counters['items_recent_launches'] > daily
+    assert (tmp_path / 'archive').exists()
+
+
+def test_run_metrics_count_only_this_runs_notion_requests(configured_main, monkeypatch, caplog):
+    caplog.set_level(logging.INFO, logger='notion_email')
+    configured_main.main(keep_connections=True)
+    first = configured_main.metrics.counters['notion_requests']
+    assert first > 0
+    # A daemon run that finds the same client: its requests are counted afresh
+    configured_main.main(keep_connections=True)
+    assert configured_main.metrics.counters['notion_requests'] == first
+    assert configured_main.notion.metrics()['requests'] == 2 * first
+    assert caplog.text.count(f"Notion requests: {first}, ") == 2
+
+
+def test_fallback_recipients_get_no_personal_section(configured_main, notion_server, monkeypatch):
+    for page in notion_server.databases[fake_notion.RELEASES_DB_ID]:
+        page['properties']['Email To']['rich_text'] = []
+        page['properties']['Email CC']['rich_text'] = []
+    monkeypatch.setattr(configured_main, 'FALLBACK_RECIPIENTS', ['all@example.com'])
+    monkeypatch.setattr(configured_main, 'FALLBACK_CC_RECIPIENTS', [])
+    configured_main.main(mode='personalized')
+
+    preview = configured_main.EMAIL_FILE_DIR
+    texts = [open(os.path.join(preview, name), encoding='utf-8').read()
+             for name in os.listdir(preview) if name.endswith('.txt')]
+    assert len(texts) == 1
+    assert 'Recent Launches' in texts[0]
+    assert 'Your Releases' not in texts[0]
+
+
+def http_error(status, retry_after=None):
+    import httpx
+    from notion_client.errors import HTTPResponseError
+    headers = {'Retry-After': retry_after} if retry_after is not None else {}
+    return HTTPResponseError(httpx.Response(status, headers=headers, request=httpx.Request('POST', 'http://notion')))
+
+
+class FlakyMethod:
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return {'ok': kwargs}
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(main.time, 'sleep', slept.append)
+    return slept
+
+
+def test_notion_retry_after_is_honored(sleeps):
+    client = main.RateLimitedNotion(None, bucket=main.TokenBucket(0, 1), max_retries=3, backoff_base=0.5,
+                                    backoff_max=30)
+    method = FlakyMethod(http_error(429, '3'), http_error(503))
+    assert client.call(method, page_size=10) == {'ok': {'page_size': 10}}
+    assert method.calls == 3
+    # Retry-After plus at most half the jittered backoff, then plain backoff
+    assert 3 <= sleeps[0] <= 3.25
+    assert 0 <= sleeps[1] <= 1
+    assert client.metrics()['requests'] == 3
+    assert client.metrics()['retries'] == 2
+
+
+def test_notion_errors_that_are_not_transient_are_raised(sleeps):
+    from notion_client.errors import HTTPResponseError
+    client = main.RateLimitedNotion(None, bucket=main.TokenBucket(0, 1), max_retries=2)
+    with pytest.raises(HTTPResponseError):
+        client.call(FlakyMethod(http_error(400)))
+    method = FlakyMethod(*[http_error(429, '1')] * 3)
+    with pytest.raises(HTTPResponseError):
+        client.call(method)
+    assert method.calls == 3
+    assert sleeps == [pytest.approx(1, abs=0.5)] * 2
+
+
+def test_token_bucket_paces_requests_past_the_burst(sleeps):
+    bucket = main.TokenBucket(rate=10, capacity=2)
+    assert bucket.acquire() == 0 and bucket.acquire() == 0
+    # sleep() is a no-op here, so the bucket keeps waiting until real time refills it
+    assert bucket.acquire() > 0
+
+
+def test_throttled_notion_still_delivers_the_digest(configured_main, notion_server):
+    notion_server.throttle_rate, notion_server.retry_after = 0.3, 0.01
+    configured_main.main()
+    assert notion_server.throttled > 0
+    assert configured_main.metrics.counters['notion_retries'] == notion_server.throttled
+    assert configured_main.metrics.counters['messages_sent'] == 1
+
+
+@pytest.fixture
+def section_store_main(configured_main, monkeypatch, tmp_path):
+    monkeypatch.setattr(configured_main, 'SECTION_STORE_PATH', str(tmp_path / 'sections.sqlite'))
+
+    def run(policy, **kwargs):
+        monkeypatch.setattr(configured_main, 'UNCHANGED_DIGEST', policy)
+        configured_main.main(**kwargs)
+        return configured_main.metrics.counters.get('messages_sent', 0)
+    return run
+
+
+def test_unchanged_digest_skip_and_notice(configured_main, section_store_main):
+    assert section_store_main('skip') == 1
+    assert section_store_main('skip') == 0
+    assert section_store_main('send') == 1
+    assert section_store_main('notice') == 1
+    preview = configured_main.EMAIL_FILE_DIR
+    (text,) = [open(os.path.join(preview, name), encoding='utf-8').read()
+               for name in os.listdir(preview) if name.endswith('.txt')]
+    assert configured_main.NO_CHANGES_MESSAGE in text
+    assert 'Recent Launches' not in text
+
+
+def test_unchanged_digest_is_tracked_per_digest(section_store_main):
+    assert section_store_main('skip', digest='daily') == 1
+    # The weekly digest never sent these sections, so it is not skipped because the daily one did
+    assert section_store_main('skip', digest='weekly') == 1
+    assert section_store_main('skip', digest='weekly') == 0
+    assert section_store_main('skip', digest='daily') == 0
+
+
+def test_sections_count_as_sent_only_once_delivered(configured_main, section_store_main, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(configured_main, 'get_recipients_from_releases', lambda snapshot: ([], []))
+        assert section_store_main('skip') == 0
+    assert section_store_main('skip') == 1
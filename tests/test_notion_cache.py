@@ -0,0 +1,91 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from notion_cache import MemoryPageCache, PageCache
+
+
+def page(page_id, days=0):
+    when = (datetime.now(timezone.utc) + timedelta(days=days)).isoformat()
+    return {'id': page_id, 'last_edited_time': when,
+            'properties': {'Date': {'type': 'date', 'date': {'start': when}},
+                           'Status': {'type': 'status', 'status': {'name': 'Completed'}}}}
+
+
+class Database:
+    """Answers fetch(filter) like databases.query: archived pages are simply not returned"""
+
+    def __init__(self, pages):
+        self.pages = {p['id']: p for p in pages}
+        self.filters = []
+
+    def fetch(self, filter):
+        self.filters.append(filter)
+        return list(self.pages.values()) if filter is None else []
+
+
+@pytest.fixture(params=['sqlite', 'memory'])
+def make_cache(request, tmp_path):
+    caches = []
+
+    def make(ttl=3600, retention_days=60):
+        if request.param == 'sqlite':
+            cache = PageCache(str(tmp_path / 'cache.sqlite'), retention_days, ttl)
+        else:
+            cache = MemoryPageCache(ttl, retention_days)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def cached_ids(cache):
+    return sorted(p['id'] for p in cache.iter_pages('db'))
+
+
+def test_later_syncs_only_ask_for_edits_since_the_watermark(make_cache):
+    cache, database = make_cache(), Database([page('a'), page('b')])
+    assert cache.sync('db', database.fetch) == 2
+    cache.sync('db', database.fetch)
+    assert database.filters[0] is None
+    assert database.filters[1]['last_edited_time']['on_or_after'] == cache.watermark('db')
+    assert cached_ids(cache) == ['a', 'b']
+
+
+def test_archived_page_is_dropped_by_the_next_full_sync(make_cache):
+    cache, database = make_cache(ttl=3600), Database([page('a'), page('b')])
+    cache.sync('db', database.fetch)
+    del database.pages['b']
+    cache.sync('db', database.fetch)
+    # The incremental sync cannot see the page go
+    assert cached_ids(cache) == ['a', 'b']
+
+    cache.ttl = timedelta(0)
+    assert cache.watermark('db') is None
+    cache.sync('db', database.fetch)
+    assert database.filters[-1] is None
+    assert cached_ids(cache) == ['a']
+
+
+def test_pages_past_the_retention_are_evicted(make_cache):
+    cache = make_cache(retention_days=30)
+    cache.sync('db', Database([page('old', days=-45), page('new', days=-3)]).fetch)
+    assert cached_ids(cache) == ['new']
+
+
+def test_cache_from_before_full_syncs_were_tracked_gets_a_full_sync(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    db = sqlite3.connect(path)
+    db.execute('CREATE TABLE sync_state (database_id TEXT PRIMARY KEY, watermark TEXT NOT NULL,'
+               ' synced_at TEXT NOT NULL)')
+    db.execute("INSERT INTO sync_state VALUES ('db', '2026-10-01T00:00:00+00:00', '2026-10-01T00:00:00+00:00')")
+    db.commit()
+    db.close()
+    cache = PageCache(path)
+    assert cache.watermark('db') is None
+    cache.sync('db', Database([page('a')]).fetch)
+    assert cache.watermark('db') is not None
+    cache.close()
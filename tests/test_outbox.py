@@ -0,0 +1,77 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from email_transport import Transport
+from outbox import FAILED, PENDING, SENT, Outbox
+
+
+class RecordingTransport(Transport):
+    """Accepts batches until `fail_after` of them were sent, then refuses with a dropped connection"""
+
+    max_recipients = 2
+
+    def __init__(self, fail_after=None):
+        self.batches = []
+        self.fail_after = fail_after
+
+    def send(self, message, from_addr, recipients, key=None):
+        if self.fail_after is not None and len(self.batches) >= self.fail_after:
+            raise ConnectionError('connection dropped')
+        self.batches.append(list(recipients))
+        return {}
+
+
+RECIPIENTS = ['a@example.com', 'b@example.com', 'c@example.com', 'd@example.com', 'e@example.com']
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    outbox = Outbox(str(tmp_path / 'outbox.sqlite'))
+    yield outbox
+    outbox.close()
+
+
+def test_interrupted_delivery_resumes_with_the_remaining_recipients(outbox):
+    assert outbox.enqueue('2026-W42', 'me@example.com', RECIPIENTS, 'message') == PENDING
+    with pytest.raises(ConnectionError):
+        outbox.deliver('2026-W42', RecordingTransport(fail_after=1))
+    assert outbox.status('2026-W42') == FAILED
+    assert outbox.pending_keys() == ['2026-W42']
+
+    # A rerun enqueues the same key again; the interrupted row is kept as it was
+    assert outbox.enqueue('2026-W42', 'me@example.com', RECIPIENTS, 'other message') == FAILED
+    transport = RecordingTransport()
+    assert outbox.flush(transport) == (1, 0)
+    assert transport.batches == [RECIPIENTS[2:4], RECIPIENTS[4:]]
+    assert outbox.status('2026-W42') == SENT
+    assert outbox.pending_keys() == []
+
+
+def test_sent_key_is_never_mailed_again(outbox):
+    outbox.enqueue('2026-W42', 'me@example.com', RECIPIENTS, 'message')
+    outbox.deliver('2026-W42', RecordingTransport())
+    assert outbox.enqueue('2026-W42', 'me@example.com', RECIPIENTS, 'message') == SENT
+    transport = RecordingTransport()
+    assert outbox.deliver('2026-W42', transport) == SENT
+    assert transport.batches == []
+
+
+def test_close_drops_sent_bodies_and_prunes_old_rows(tmp_path):
+    path = str(tmp_path / 'outbox.sqlite')
+    outbox = Outbox(path, retention_days=7)
+    for key in ('old', 'recent', 'pending'):
+        outbox.enqueue(key, 'me@example.com', RECIPIENTS[:1], 'body')
+    outbox.deliver('old', RecordingTransport())
+    outbox.deliver('recent', RecordingTransport())
+    long_ago = (datetime.now(timezone.utc) - timedelta(days=30)).isoformat()
+    outbox._db.execute("UPDATE outbox SET sent_at = ? WHERE key = 'old'", (long_ago,))
+    outbox._db.commit()
+    outbox.close()
+
+    db = sqlite3.connect(path)
+    rows = dict(db.execute('SELECT key, message FROM outbox').fetchall())
+    db.close()
+    assert rows == {'recent': '', 'pending': 'body'}
+
@@ -0,0 +1,77 @@
+from notion_cache import page_matches_filter
+from query_plan import Query, all_of, any_of, date_between, merge_filters, plan_queries
+
+
+def page(status=None, date=None, priority=None):
+    properties = {}
+    if status:
+        properties['Status'] = {'status': {'name': status}}
+    if date:
+        properties['Date'] = {'date': {'start': date}}
+    if priority:
+        properties['Priority'] = {'select': {'name': priority}}
+    return {'id': f'{status}-{date}-{priority}', 'properties': properties}
+
+
+COMPLETED = any_of('Status', 'status', ['Completed'])
+UPCOMING = any_of('Status', 'status', ['Upcoming', 'In Progress'])
+THIS_WEEK = date_between('Date', after='2026-10-10T00:00:00Z', before='2026-10-17T00:00:00Z')
+
+
+def test_page_matches_status_and_date():
+    assert page_matches_filter(page('Completed', '2026-10-12'), all_of(COMPLETED, THIS_WEEK))
+    assert not page_matches_filter(page('Completed', '2026-10-01'), all_of(COMPLETED, THIS_WEEK))
+    assert not page_matches_filter(page('Blocked', '2026-10-12'), all_of(COMPLETED, THIS_WEEK))
+    assert page_matches_filter(page('In Progress'), UPCOMING)
+    assert not page_matches_filter(page(date='2026-10-12'), UPCOMING)
+
+
+def test_page_without_the_date_does_not_match_a_range():
+    assert not page_matches_filter(page('Completed'), THIS_WEEK)
+    assert page_matches_filter(page('Completed'), None)
+
+
+def test_merge_filters_matches_any_of_its_filters():
+    filters = [all_of(COMPLETED, THIS_WEEK), all_of(UPCOMING, THIS_WEEK), all_of(COMPLETED, THIS_WEEK)]
+    merged = merge_filters(filters)
+    # Both the OR inside UPCOMING and the duplicate are flattened: one level of OR over ANDs
+    assert len(merged['or']) == 3
+    assert all('or' not in leaf for clause in merged['or'] for leaf in clause['and'])
+    pages = [page(status, date) for status in ('Completed', 'Upcoming', 'In Progress', 'Blocked')
+             for date in ('2026-10-01', '2026-10-12', None)]
+    for candidate in pages:
+        assert page_matches_filter(candidate, merged) == any(page_matches_filter(candidate, f) for f in filters)
+
+
+def test_merge_filters_with_an_unfiltered_query_matches_everything():
+    assert merge_filters([COMPLETED, None]) is None
+
+
+def test_plan_merges_queries_of_one_database_and_routes_pages_back():
+    queries = {
+        'recent': Query('releases', all_of(COMPLETED, THIS_WEEK)),
+        'upcoming': Query('releases', UPCOMING),
+        'fixes': Query('tasks', any_of('Priority', 'select', ['High'])),
+    }
+    plan = plan_queries(queries)
+    assert plan['recent'] is plan['upcoming']
+    assert plan['fixes'] is not plan['recent']
+    pages = [page('Completed', '2026-10-12'), page('Upcoming', '2026-10-20'), page('Blocked', '2026-10-12')]
+    routed = list(plan['recent'].route(pages))
+    assert [(name, candidate['id']) for name, candidate in routed] == [
+        ('recent', pages[0]['id']), ('upcoming', pages[1]['id'])]
+
+
+def test_plan_without_merging_still_runs_identical_queries_once():
+    queries = {'a': Query('releases', COMPLETED), 'b': Query('releases', COMPLETED), 'c': Query('releases', UPCOMING)}
+    plan = plan_queries(queries, merge=False)
+    assert plan['a'] is plan['b']
+    assert plan['c'] is not plan['a']
+
+
+
+def test_route_counts_pages_that_match_no_member():
+    group = plan_queries({'recent': Query('releases', COMPLETED), 'upcoming': Query('releases', UPCOMING)})['recent']
+    pages = [page('Completed'), page('Blocked'), page('Upcoming'), page()]
+    assert [name for name, _ in group.route(pages)] == ['recent', 'upcoming']
+    assert group.unrouted == 2
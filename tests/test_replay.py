@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from replay import compare_directories
+
+
+@pytest.fixture
+def recorded(configured_main, tmp_path, notion_server):
+    """A --record of one dry run against the fake server, and the output it wrote as the golden copy"""
+    path, golden = str(tmp_path / 'run.json.gz'), str(tmp_path / 'golden')
+    configured_main.record_run(path, lambda now: configured_main.dry_run(golden, now=now))
+    notion_server.stop()
+    return path, golden
+
+
+def test_replay_reproduces_the_golden_output(configured_main, recorded, tmp_path):
+    path, golden = recorded
+    assert sorted(os.listdir(golden))
+    assert configured_main.dry_run(str(tmp_path / 'out'), path, golden) == []
+    # Nothing from the replay leaks into the settings of later runs
+    assert configured_main.replaying is False
+    assert configured_main.EMAIL_TRANSPORT == 'file'
+
+
+def test_replay_reports_changed_output(configured_main, recorded, tmp_path):
+    path, golden = recorded
+    name = next(name for name in os.listdir(golden) if name.endswith('.txt'))
+    with open(os.path.join(golden, name), 'a', encoding='utf-8') as f:
+        f.write('an extra line\n')
+    differences = configured_main.dry_run(str(tmp_path / 'out'), path, golden)
+    assert len(differences) == 1
+    assert 'an extra line' in differences[0]
+
+
+def test_replay_of_a_query_that_was_not_recorded_fails(configured_main, recorded, tmp_path, monkeypatch):
+    path, _ = recorded
+    monkeypatch.setattr(configured_main, 'DEVELOPMENT_TASKS_DB', 'another-database')
+    with pytest.raises(LookupError):
+        configured_main.dry_run(str(tmp_path / 'out'), path)
+
+
+def test_compare_directories_reports_a_missing_directory(tmp_path):
+    (tmp_path / 'golden').mkdir()
+    assert compare_directories(str(tmp_path / 'out'), str(tmp_path / 'golden')) == [
+        f"{tmp_path / 'out'}: no such directory"]
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from scheduler import CronSchedule
+
+
+def at(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_weekly_digest_fires_on_friday_evening():
+    # 2026-10-15 is a Thursday
+    assert CronSchedule('0 23 * * 5').next_after(at(2026, 10, 15, 12, 0)) == at(2026, 10, 16, 23, 0)
+
+
+def test_next_after_is_strictly_after():
+    schedule = CronSchedule('0 23 * * fri')
+    assert schedule.next_after(at(2026, 10, 16, 23, 0)) == at(2026, 10, 23, 23, 0)
+
+
+def test_steps_ranges_and_names():
+    schedule = CronSchedule('*/15 9-17 * * mon-fri')
+    assert schedule.next_after(at(2026, 10, 16, 17, 50)) == at(2026, 10, 19, 9, 0)
+    assert schedule.next_after(at(2026, 10, 19, 9, 7, 30)) == at(2026, 10, 19, 9, 15)
+
+
+def test_aliases_and_sunday_as_seven():
+    assert CronSchedule('@daily').next_after(at(2026, 10, 16, 0, 0)) == at(2026, 10, 17, 0, 0)
+    assert CronSchedule('0 0 * * 7').next_after(at(2026, 10, 16)) == at(2026, 10, 18)
+
+
+def test_restricted_day_of_month_or_day_of_week():
+    # Fires on the 1st of the month and on Mondays, as cron does
+    schedule = CronSchedule('0 8 1 * 1')
+    assert schedule.next_after(at(2026, 10, 16)) == at(2026, 10, 19, 8, 0)
+    assert schedule.next_after(at(2026, 10, 27)) == at(2026, 11, 1, 8, 0)
+
+
+def test_keeps_the_timezone_of_its_argument():
+    zone = timezone(timedelta(hours=2))
+    assert CronSchedule('30 6 * * *').next_after(datetime(2026, 10, 16, 7, 0, tzinfo=zone)).tzinfo is zone
+
+
+@pytest.mark.parametrize('expression', ['0 23 * *', '60 * * * *', '0 0 * * mon-', '*/0 * * * *'])
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_schedule_that_never_fires():
+    with pytest.raises(ValueError):
+        CronSchedule('0 0 31 2 *').next_after(at(2026, 1, 1))
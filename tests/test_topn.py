@@ -0,0 +1,45 @@
+import random
+
+from topn import TopN
+
+
+def test_keeps_the_smallest_values_in_order():
+    top = TopN(3)
+    for value in [5, 1, 4, 2, 3]:
+        top.add(value)
+    assert top.items() == [1, 2, 3]
+    assert top.seen == 5
+    assert top.omitted == 2
+
+
+def test_reverse_keeps_the_largest_first():
+    top = TopN(2, reverse=True)
+    for value in [5, 1, 4, 2, 3]:
+        top.add(value)
+    assert top.items() == [5, 4]
+
+
+def test_add_returns_the_value_left_out():
+    top = TopN(2)
+    assert top.add(3) is None
+    assert top.add(1) is None
+    assert top.add(2) == 3
+    assert top.add(9) == 9
+
+
+def test_limit_zero_keeps_everything():
+    top = TopN(0, key=lambda value: -value)
+    for value in range(10):
+        top.add(value)
+    assert top.items() == list(range(9, -1, -1))
+    assert top.omitted == 0
+
+
+def test_ties_keep_arrival_order_like_a_stable_sort():
+    rng = random.Random(7)
+    values = [(rng.randint(0, 5), i) for i in range(200)]
+    for reverse in (False, True):
+        top = TopN(25, key=lambda value: value[0], reverse=reverse)
+        for value in values:
+            top.add(value)
+        assert top.items() == sorted(values, key=lambda value: value[0], reverse=reverse)[:25]
@@ -0,0 +1,62 @@
+"""Bounded top-N selection over a stream, for sections that can grow to tens of thousands of rows.
+
+TopN keeps the first `limit` values of a stream in key order in a heap of
+`limit` entries, and counts what it had to leave out, so a section's memory
+stays flat however many rows its query matches. Ties keep their arrival order,
+exactly as a stable sort of the whole stream would.
+"""
+import heapq
+import itertools
+
+
+class _Descending:
+    """Heap entry whose ordering is inverted, turning heapq's min-heap into a max-heap"""
+    __slots__ = ('entry',)
+
+    def __init__(self, entry):
+        self.entry = entry
+
+    def __lt__(self, other):
+        return other.entry < self.entry
+
+
+class TopN:
+    """The first `limit` values of a stream sorted by `key` (largest first with `reverse`); limit 0 keeps all"""
+
+    def __init__(self, limit=0, key=None, reverse=False):
+        self.limit = limit
+        self.key = key or (lambda value: value)
+        self.reverse = reverse
+        self.seen = 0
+        self._heap = []
+        self._order = itertools.count()
+
+    @property
+    def omitted(self):
+        return self.seen - len(self._heap)
+
+    def _entry(self, value):
+        # The root of the heap is always the value that sorts last among those kept
+        key, order = self.key(value), next(self._order)
+        if self.reverse:
+            return (key, -order, value)
+        return _Descending((key, order, value))
+
+    def add(self, value):
+        """Offer a value; returns the one left out because of it (possibly `value` itself), or None"""
+        self.seen += 1
+        entry = self._entry(value)
+        if not self.limit or len(self._heap) < self.limit:
+            if self.limit:
+                heapq.heappush(self._heap, entry)
+            else:
+                self._heap.append(entry)
+            return None
+        dropped = heapq.heappushpop(self._heap, entry)
+        return dropped[2] if self.reverse else dropped.entry[2]
+
+    def items(self):
+        """The kept values, in sorted order"""
+        if self.reverse:
+            return [value for _, _, value in sorted(self._heap, key=lambda entry: entry[:2], reverse=True)]
+        return [entry.entry[2] for entry in sorted(self._heap, key=lambda entry: entry.entry[:2])]